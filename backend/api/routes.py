@@ -14,7 +14,8 @@ api = Blueprint("api", __name__)
 
 def normalize_course_data(data):
     """Ensure data follows the new multi-course structure."""
-    if "courses" in data and isinstance(data["courses"], list):
+    # Firestore reads always carry a courses list, so this is the common path
+    if isinstance(data.get("courses"), list):
         return data
 
     # Create default course from existing data
@@ -1,8 +1,10 @@
 """
 Admin core routes: authentication and course/module management.
 """
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, Optional
 
 from flask import Blueprint, jsonify, request
@@ -25,7 +27,182 @@ from firestore.course_data import (
     update_course_data as update_course_data_to_firestore,
     course_data_exists,
 )
-from students.student_helpers import get_total_labs_count
+from students.student_helpers import get_total_labs_count, invalidate_total_labs_count
+
+# Assignment field syncs touch every user document, so they run off the
+# request thread; one worker keeps them ordered.
+_sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="assignment-sync")
+_sync_lock = threading.Lock()
+_sync_queued = False
+
+
+def _index_by_id(items: list) -> dict:
+    """Map each item's id to its position in items."""
+    return {item["id"]: i for i, item in enumerate(items)}
+
+
+def _next_version(previous_version) -> int:
+    """
+    Return the version for a new save: normally the current epoch ms, but
+    always above previous_version so a clock step back can't hide an update
+    from clients polling /course/version.
+    """
+    return max(int(time.time() * 1000), int(previous_version or 0) + 1)
+
+
+def _module_order(module: dict):
+    return module.get("order", 0)
+
+
+class CourseOperationError(Exception):
+    """A course/module change that can't be applied, with the HTTP status to report."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _course_index(data: dict, course_id: str) -> int:
+    course_index = _index_by_id(data["courses"]).get(course_id)
+    if course_index is None:
+        raise CourseOperationError("Course not found", 404)
+    return course_index
+
+
+def _target_course(data: dict, course_id: Optional[str]) -> dict:
+    """Return the course a module operation targets (the first course by default)."""
+    if not data["courses"]:
+        raise CourseOperationError("No courses found", 500)
+    if course_id:
+        return data["courses"][_course_index(data, course_id)]
+    return data["courses"][0]
+
+
+def _validated_module(module: dict) -> dict:
+    try:
+        validate_module(module)
+    except ValidationError as e:
+        logger.warning(f"Module validation failed: {str(e)}")
+        raise CourseOperationError(f"Validation failed: {str(e)}", 400)
+    return module
+
+
+def _apply_add_course(data: dict, req_data: dict) -> dict:
+    if "title" not in req_data:
+        raise CourseOperationError("Title is required", 400)
+
+    new_course = {
+        "id": str(uuid.uuid4()),
+        "title": req_data["title"],
+        "isVisible": req_data.get("isVisible", False),  # Default hidden
+        "modules": [],
+        "links": [],
+        "metadata": {
+            "schedule": "",
+            "pricing": {"standard": 0, "student": 0},
+        },
+    }
+    data["courses"].append(new_course)
+    return new_course
+
+
+def _apply_update_course(data: dict, course_id: str, req_data: dict) -> dict:
+    course = data["courses"][_course_index(data, course_id)]
+    if "title" in req_data:
+        course["title"] = req_data["title"]
+    if "isVisible" in req_data:
+        course["isVisible"] = req_data["isVisible"]
+    if "metadata" in req_data:
+        course["metadata"] = req_data["metadata"]
+    return course
+
+
+def _apply_delete_course(data: dict, course_id: str) -> None:
+    data["courses"].pop(_course_index(data, course_id))
+
+
+def _apply_add_module(data: dict, course_id: Optional[str], new_module: dict) -> dict:
+    target_course = _target_course(data, course_id)
+    _validated_module(new_module)
+
+    new_module["id"] = str(uuid.uuid4())
+
+    # Set order if not provided
+    if "order" not in new_module:
+        new_module["order"] = len(target_course["modules"]) + 1
+
+    # Stored lists aren't guaranteed sorted (e.g. after PUT /admin/data), so
+    # re-sort rather than insert into place; lists hold a handful of modules
+    target_course["modules"].append(new_module)
+    target_course["modules"].sort(key=_module_order)
+    logger.info(f'Module added: {new_module["id"]} to course {target_course["id"]}')
+    return new_module
+
+
+def _apply_update_module(
+    data: dict, course_id: Optional[str], module_id: str, updates: dict
+) -> dict:
+    modules = _target_course(data, course_id)["modules"]
+
+    # Find existing module first to support partial updates
+    existing_module_index = _index_by_id(modules).get(module_id)
+    if existing_module_index is None:
+        logger.warning(f"Module not found: {module_id}")
+        raise CourseOperationError("Module not found", 404)
+
+    # Merge existing module with updates
+    merged_module = modules[existing_module_index].copy()
+    merged_module.update(updates)
+    merged_module["id"] = module_id  # Ensure ID doesn't change
+    _validated_module(merged_module)
+
+    # Update the module in the list
+    modules[existing_module_index] = merged_module
+    modules.sort(key=_module_order)
+    logger.info(f"Module updated: {module_id}")
+    return merged_module
+
+
+def _apply_delete_module(data: dict, course_id: Optional[str], module_id: str) -> None:
+    target_course = _target_course(data, course_id)
+
+    # Drop the module and renumber the remaining ones in a single pass
+    remaining = []
+    for module in target_course["modules"]:
+        if module["id"] != module_id:
+            module["order"] = len(remaining) + 1
+            remaining.append(module)
+    target_course["modules"] = remaining
+
+
+def _apply_operation(data: dict, op: dict) -> Optional[dict]:
+    """Apply one /admin/batch operation to data and return the created/updated item."""
+    if not isinstance(op, dict):
+        raise CourseOperationError("Each operation must be an object", 400)
+
+    name = op.get("op")
+    if name == "add_course":
+        return _apply_add_course(data, op.get("course") or {})
+    if name == "update_course":
+        return _apply_update_course(data, op.get("courseId"), op.get("course") or {})
+    if name == "delete_course":
+        _apply_delete_course(data, op.get("courseId"))
+        return None
+
+    if name in ("update_module", "delete_module") and not op.get("moduleId"):
+        raise CourseOperationError("moduleId is required", 400)
+    if name in ("add_module", "update_module") and not op.get("module"):
+        raise CourseOperationError("module is required", 400)
+
+    if name == "add_module":
+        return _apply_add_module(data, op.get("courseId"), op["module"])
+    if name == "update_module":
+        return _apply_update_module(data, op.get("courseId"), op["moduleId"], op["module"])
+    if name == "delete_module":
+        _apply_delete_module(data, op.get("courseId"), op["moduleId"])
+        return None
+    raise CourseOperationError(f"Unknown operation: {name}", 400)
 
 
 def register_admin_core_routes(
@@ -106,7 +283,7 @@ def register_admin_core_routes(
     def get_admin_data():
         """Get full course data (admin view)."""
         try:
-            data = get_course_data_from_firestore()
+            data = get_course_data_from_firestore(use_cache=False)
             
             if not data:
                 return jsonify({"error": "Course data not available"}), 500
@@ -116,44 +293,39 @@ def register_admin_core_routes(
         except Exception as e:  # pragma: no cover - defensive
             return jsonify({"error": str(e)}), 500
 
+    def _save_course_data(data: dict) -> bool:
+        """Bump the version, persist data, and refresh dependent caches."""
+        data["version"] = _next_version(data.get("version"))
+
+        if not update_course_data_to_firestore(data):
+            return False
+
+        # Invalidate caches and sync assignment fields
+        _invalidate_caches_and_sync_fields(sheets_manager)
+        return True
+
+    def _load_course_data() -> Optional[dict]:
+        data = get_course_data_from_firestore(use_cache=False)
+        return normalize_course_data(data) if data else None
+
     @api.route("/admin/courses", methods=["POST"])
     @require_auth
     def add_course():
         """Add new course."""
         try:
-            data = get_course_data_from_firestore()
+            data = _load_course_data()
             
             if not data:
                 return jsonify({"error": "Course data not available"}), 500
 
-            data = normalize_course_data(data)
+            new_course = _apply_add_course(data, request.get_json() or {})
 
-            req_data = request.get_json() or {}
-            if "title" not in req_data:
-                return jsonify({"error": "Title is required"}), 400
-
-            new_course = {
-                "id": str(uuid.uuid4()),
-                "title": req_data["title"],
-                "isVisible": req_data.get("isVisible", False),  # Default hidden
-                "modules": [],
-                "links": [],
-                "metadata": {
-                    "schedule": "",
-                    "pricing": {"standard": 0, "student": 0},
-                },
-            }
-
-            data["courses"].append(new_course)
-            data["version"] = int(time.time() * 1000)
-
-            if not update_course_data_to_firestore(data):
+            if not _save_course_data(data):
                 return jsonify({"error": "Failed to save course data"}), 500
             
-            # Invalidate caches and sync assignment fields
-            _invalidate_caches_and_sync_fields(sheets_manager)
-            
             return jsonify({"success": True, "course": new_course}), 201
+        except CourseOperationError as e:
+            return jsonify({"error": e.message}), e.status_code
         except Exception as e:  # pragma: no cover - defensive
             return jsonify({"error": str(e)}), 500
 
@@ -162,39 +334,19 @@ def register_admin_core_routes(
     def update_course(course_id):
         """Update course metadata (title, visibility, metadata)."""
         try:
-            data = get_course_data_from_firestore()
+            data = _load_course_data()
             
             if not data:
                 return jsonify({"error": "Course data not available"}), 500
 
-            data = normalize_course_data(data)
+            _apply_update_course(data, course_id, request.get_json() or {})
 
-            req_data = request.get_json() or {}
-
-            course_found = False
-            for course in data["courses"]:
-                if course["id"] == course_id:
-                    if "title" in req_data:
-                        course["title"] = req_data["title"]
-                    if "isVisible" in req_data:
-                        course["isVisible"] = req_data["isVisible"]
-                    if "metadata" in req_data:
-                        course["metadata"] = req_data["metadata"]
-                    course_found = True
-                    break
-
-            if not course_found:
-                return jsonify({"error": "Course not found"}), 404
-
-            data["version"] = int(time.time() * 1000)
-            
-            if not update_course_data_to_firestore(data):
+            if not _save_course_data(data):
                 return jsonify({"error": "Failed to save course data"}), 500
             
-            # Invalidate caches and sync assignment fields
-            _invalidate_caches_and_sync_fields(sheets_manager)
-            
             return jsonify({"success": True, "message": "Course updated"}), 200
+        except CourseOperationError as e:
+            return jsonify({"error": e.message}), e.status_code
         except Exception as e:  # pragma: no cover - defensive
             return jsonify({"error": str(e)}), 500
 
@@ -203,35 +355,22 @@ def register_admin_core_routes(
     def delete_course(course_id):
         """Delete a course."""
         try:
-            data = get_course_data_from_firestore()
+            data = _load_course_data()
             
             if not data:
                 return jsonify({"error": "Course data not available"}), 500
 
-            data = normalize_course_data(data)
+            _apply_delete_course(data, course_id)
 
-            # Check if course exists
-            course_exists = any(course["id"] == course_id for course in data["courses"])
-
-            if not course_exists:
-                return jsonify({"error": "Course not found"}), 404
-
-            # Filter out the course to delete
-            data["courses"] = [c for c in data["courses"] if c["id"] != course_id]
-
-            # Update version
-            data["version"] = int(time.time() * 1000)
-
-            if not update_course_data_to_firestore(data):
+            if not _save_course_data(data):
                 return jsonify({"error": "Failed to save course data"}), 500
             
-            # Invalidate caches and sync assignment fields
-            _invalidate_caches_and_sync_fields(sheets_manager)
-            
             return (
                 jsonify({"success": True, "message": "Course deleted successfully"}),
                 200,
             )
+        except CourseOperationError as e:
+            return jsonify({"error": e.message}), e.status_code
         except Exception as e:  # pragma: no cover - defensive
             logger.error(f"Error deleting course: {str(e)}", exc_info=True)
             return jsonify({"error": str(e)}), 500
@@ -253,8 +392,9 @@ def register_admin_core_routes(
                 logger.warning(f"Course data validation failed: {str(e)}")
                 return jsonify({"error": f"Validation failed: {str(e)}"}), 400
 
-            # Update version
-            data["version"] = int(time.time() * 1000)
+            # Update version (the body's own version is the client's copy)
+            stored = get_course_data_from_firestore(use_cache=False) or {}
+            data["version"] = _next_version(stored.get("version"))
 
             if not update_course_data_to_firestore(data):
                 return jsonify({"error": "Failed to save course data"}), 500
@@ -280,66 +420,24 @@ def register_admin_core_routes(
     def add_module():
         """Add new module."""
         try:
-            data = get_course_data_from_firestore()
+            data = _load_course_data()
             
             if not data:
                 return jsonify({"error": "Course data not available"}), 500
 
-            data = normalize_course_data(data)
-
             new_module = request.get_json()
 
             if not new_module:
                 return jsonify({"error": "Request body is required"}), 400
 
-            course_id = request.args.get("courseId")
-            target_course = None
-
-            if not data["courses"]:
-                return jsonify({"error": "No courses found"}), 500
-
-            if course_id:
-                for course in data["courses"]:
-                    if course["id"] == course_id:
-                        target_course = course
-                        break
-                if not target_course:
-                    return jsonify({"error": "Course not found"}), 404
-            else:
-                # Default to first course
-                target_course = data["courses"][0]
-
-            # Validate module data
-            try:
-                validate_module(new_module)
-            except ValidationError as e:
-                logger.warning(f"Module validation failed: {str(e)}")
-                return jsonify({"error": f"Validation failed: {str(e)}"}), 400
-
-            new_module["id"] = str(uuid.uuid4())
-
-            # Set order if not provided
-            if "order" not in new_module:
-                new_module["order"] = len(target_course["modules"]) + 1
+            _apply_add_module(data, request.args.get("courseId"), new_module)
 
-            target_course["modules"].append(new_module)
-            target_course["modules"].sort(key=lambda x: x.get("order", 0))
-
-            # Update version
-            data["version"] = int(time.time() * 1000)
-
-            if not update_course_data_to_firestore(data):
+            if not _save_course_data(data):
                 return jsonify({"error": "Failed to save course data"}), 500
             
-            # Invalidate caches and sync assignment fields
-            _invalidate_caches_and_sync_fields(sheets_manager)
-            
-            logger.info(
-                f'Module added: {new_module["id"]} to course {target_course["id"]}'
-            )
             return jsonify({"success": True, "module": new_module}), 201
-        except ValidationError as e:  # pragma: no cover - defensive
-            return jsonify({"error": f"Validation failed: {str(e)}"}), 400
+        except CourseOperationError as e:
+            return jsonify({"error": e.message}), e.status_code
         except Exception as e:  # pragma: no cover - defensive
             logger.error(f"Error adding module: {str(e)}", exc_info=True)
             return jsonify({"error": "Internal server error"}), 500
@@ -349,76 +447,26 @@ def register_admin_core_routes(
     def update_module(module_id):
         """Update module."""
         try:
-            data = get_course_data_from_firestore()
+            data = _load_course_data()
             
             if not data:
                 return jsonify({"error": "Course data not available"}), 500
 
-            data = normalize_course_data(data)
-
             updated_module = request.get_json()
 
             if not updated_module:
                 return jsonify({"error": "Request body is required"}), 400
 
-            course_id = request.args.get("courseId")
-            target_course = None
-
-            if not data["courses"]:
-                return jsonify({"error": "No courses found"}), 500
-
-            if course_id:
-                for course in data["courses"]:
-                    if course["id"] == course_id:
-                        target_course = course
-                        break
-                if not target_course:
-                    return jsonify({"error": "Course not found"}), 404
-            else:
-                # Default to first course
-                target_course = data["courses"][0]
-
-            # Find existing module first to support partial updates
-            existing_module_index = -1
-            for i, module in enumerate(target_course["modules"]):
-                if module["id"] == module_id:
-                    existing_module_index = i
-                    break
-
-            if existing_module_index == -1:
-                logger.warning(f"Module not found: {module_id}")
-                return jsonify({"error": "Module not found"}), 404
-
-            # Merge existing module with updates
-            merged_module = target_course["modules"][existing_module_index].copy()
-            merged_module.update(updated_module)
-            merged_module["id"] = module_id  # Ensure ID doesn't change
-
-            # Validate merged module data
-            try:
-                validate_module(merged_module)
-            except ValidationError as e:
-                logger.warning(f"Module validation failed: {str(e)}")
-                return jsonify({"error": f"Validation failed: {str(e)}"}), 400
-
-            # Update the module in the list
-            target_course["modules"][existing_module_index] = merged_module
-
-            target_course["modules"].sort(key=lambda x: x.get("order", 0))
-
-            # Update version
-            data["version"] = int(time.time() * 1000)
+            _apply_update_module(
+                data, request.args.get("courseId"), module_id, updated_module
+            )
 
-            if not update_course_data_to_firestore(data):
+            if not _save_course_data(data):
                 return jsonify({"error": "Failed to save course data"}), 500
             
-            # Invalidate caches and sync assignment fields
-            _invalidate_caches_and_sync_fields(sheets_manager)
-            
-            logger.info(f"Module updated: {module_id}")
             return jsonify({"success": True, "module": updated_module}), 200
-        except ValidationError as e:  # pragma: no cover - defensive
-            return jsonify({"error": f"Validation failed: {str(e)}"}), 400
+        except CourseOperationError as e:
+            return jsonify({"error": e.message}), e.status_code
         except Exception as e:  # pragma: no cover - defensive
             logger.error(f"Error updating module: {str(e)}", exc_info=True)
             return jsonify({"error": "Internal server error"}), 500
@@ -429,54 +477,63 @@ def register_admin_core_routes(
     def delete_module(module_id):
         """Delete module."""
         try:
-            data = get_course_data_from_firestore()
+            data = _load_course_data()
             
             if not data:
                 return jsonify({"error": "Course data not available"}), 500
 
-            data = normalize_course_data(data)
-
-            course_id = request.args.get("courseId")
-            target_course = None
-
-            if not data["courses"]:
-                return jsonify({"error": "No courses found"}), 500
-
-            if course_id:
-                for course in data["courses"]:
-                    if course["id"] == course_id:
-                        target_course = course
-                        break
-                if not target_course:
-                    return jsonify({"error": "Course not found"}), 404
-            else:
-                # Default to first course
-                target_course = data["courses"][0]
-
-            target_course["modules"] = [
-                m for m in target_course["modules"] if m["id"] != module_id
-            ]
-
-            # Reorder remaining modules
-            for i, module in enumerate(target_course["modules"]):
-                module["order"] = i + 1
+            _apply_delete_module(data, request.args.get("courseId"), module_id)
 
-            # Update version
-            data["version"] = int(time.time() * 1000)
-
-            if not update_course_data_to_firestore(data):
+            if not _save_course_data(data):
                 return jsonify({"error": "Failed to save course data"}), 500
             
-            # Invalidate caches and sync assignment fields
-            _invalidate_caches_and_sync_fields(sheets_manager)
-            
             return (
                 jsonify({"success": True, "message": "Module deleted successfully"}),
                 200,
             )
+        except CourseOperationError as e:
+            return jsonify({"error": e.message}), e.status_code
         except Exception as e:  # pragma: no cover - defensive
             return jsonify({"error": str(e)}), 500
 
+    @api.route("/admin/batch", methods=["POST"])
+    @require_auth
+    def apply_batch():
+        """
+        Apply several course/module operations with one read and one write.
+
+        Body: {"ops": [{"op": "add_module", "courseId": ..., "module": {...}}, ...]}
+        Supported ops: add_course, update_course, delete_course (with "course"
+        and "courseId"), add_module, update_module, delete_module (with
+        "courseId", "moduleId" and "module"). Ops are applied in order; if any
+        fails, nothing is saved.
+        """
+        try:
+            ops = (request.get_json() or {}).get("ops")
+            if not isinstance(ops, list) or not ops:
+                return jsonify({"error": "ops must be a non-empty list"}), 400
+
+            data = _load_course_data()
+
+            if not data:
+                return jsonify({"error": "Course data not available"}), 500
+
+            results = []
+            for index, op in enumerate(ops):
+                try:
+                    results.append(_apply_operation(data, op))
+                except CourseOperationError as e:
+                    return jsonify({"error": e.message, "index": index}), e.status_code
+
+            if not _save_course_data(data):
+                return jsonify({"error": "Failed to save course data"}), 500
+
+            logger.info(f"Applied batch of {len(ops)} course operations")
+            return jsonify({"success": True, "results": results}), 200
+        except Exception as e:  # pragma: no cover - defensive
+            logger.error(f"Error applying batch: {str(e)}", exc_info=True)
+            return jsonify({"error": "Internal server error"}), 500
+
 
 def _invalidate_caches_and_sync_fields(sheets_manager: Optional[object]) -> None:
     """
@@ -486,9 +543,12 @@ def _invalidate_caches_and_sync_fields(sheets_manager: Optional[object]) -> None
     1. Lab count cache is cleared
     2. Student data caches are cleared
     3. Firestore operations cache is cleared
-    4. Assignment fields are synced to match current lab count
+    4. Assignment fields are synced to match current lab count (in the background)
     """
     try:
+        # Clear the process-wide lab count (also needed without a sheets manager)
+        invalidate_total_labs_count()
+        
         # Clear GoogleSheetsManager caches
         if sheets_manager and hasattr(sheets_manager, 'invalidate_all_caches'):
             sheets_manager.invalidate_all_caches()
@@ -502,17 +562,39 @@ def _invalidate_caches_and_sync_fields(sheets_manager: Optional[object]) -> None
             logger.warning(f"Failed to clear Firestore cache: {e}")
         
         # Sync assignment fields to match current lab count
-        try:
-            sync_stats = sync_assignment_fields_to_lab_count()
-            logger.info(
-                f"Synced assignment fields: {sync_stats['updated']} students updated "
-                f"({sync_stats['added']} fields added, {sync_stats['removed']} fields removed)"
-            )
-        except Exception as e:
-            logger.warning(f"Failed to sync assignment fields: {e}")
+        _schedule_assignment_sync()
                 
     except Exception as e:
         logger.error(f"Error invalidating caches: {e}", exc_info=True)
         # Don't fail the request if cache invalidation fails
 
 
+def _schedule_assignment_sync() -> None:
+    """
+    Queue an assignment field sync on the background worker.
+
+    The sync reads the lab count when it starts, so edits made while one is
+    still waiting are covered by it and don't queue another.
+    """
+    global _sync_queued
+    with _sync_lock:
+        if _sync_queued:
+            return
+        _sync_queued = True
+    _sync_executor.submit(_run_assignment_sync)
+
+
+def _run_assignment_sync() -> None:
+    global _sync_queued
+    with _sync_lock:
+        _sync_queued = False
+    try:
+        sync_stats = sync_assignment_fields_to_lab_count()
+        logger.info(
+            f"Synced assignment fields: {sync_stats['updated']} students updated "
+            f"({sync_stats['added']} fields added, {sync_stats['removed']} fields removed)"
+        )
+    except Exception as e:
+        logger.warning(f"Failed to sync assignment fields: {e}")
+
+
@@ -8,8 +8,10 @@ from datetime import datetime, timezone
 from flask import Blueprint, jsonify, request
 
 from core.auth import require_auth
+from core.validators import ValidationError, validate_bulk_student_updates
 from core.logger import logger
 from students.student_helpers import (
+    get_allowed_assignment_field_set,
     get_allowed_assignment_fields,
     get_student_email,
     get_total_labs_count,
@@ -20,8 +22,7 @@ from students.student_helpers import (
 from sheets.sheets_utils import validate_email_list
 from firestore.operations_cache import (
     acquire_sync_lock,
-    get_metrics_from_firestore,
-    get_sync_status,
+    get_sync_status_and_metrics,
     release_sync_lock,
 )
 from firestore.admin_data import (
@@ -33,6 +34,12 @@ from firestore.admin_data import (
     bulk_update_users_admin_data,
 )
 
+# Firestore field names accepted by the per-student updates
+_ADMIN_UPDATE_FIELDS = frozenset({
+    'attendance', 'assignmentGrades', 'teacherEvaluation', 'paymentStatus',
+    'paymentComment', 'paymentScreenshot', 'resumeLink', 'name',
+})
+
 
 def register_admin_student_routes(
     api: Blueprint,
@@ -45,7 +52,8 @@ def register_admin_student_routes(
     def get_all_students():
         """Get all Firebase users with their admin data."""
         try:
-            users = get_all_users_admin_data()
+            force_refresh = request.args.get("force_refresh", "false").lower() == "true"
+            users = get_all_users_admin_data(use_cache=not force_refresh)
             
             # Convert to format expected by frontend
             students = []
@@ -115,8 +123,9 @@ def register_admin_student_routes(
             # Get total labs to determine allowed assignment grade fields
             total_labs = get_total_labs_count()
             allowed_fields = get_allowed_assignment_fields(total_labs)
+            allowed_field_set = get_allowed_assignment_field_set(total_labs)
 
-            updates = {k: v for k, v in data.items() if k in allowed_fields or k in ['attendance', 'assignmentGrades', 'teacherEvaluation', 'paymentStatus', 'paymentComment', 'paymentScreenshot', 'resumeLink', 'name']}
+            updates = {k: v for k, v in data.items() if k in allowed_field_set or k in _ADMIN_UPDATE_FIELDS}
 
             if not updates:
                 return (
@@ -137,8 +146,8 @@ def register_admin_student_routes(
                     return jsonify({"error": error_msg}), 400
 
             # Validate grade fields are strings or numbers
-            for grade_field in allowed_fields:
-                if grade_field.startswith("Assignment") and grade_field in updates:
+            for grade_field in updates:
+                if grade_field.startswith("Assignment") and grade_field in allowed_field_set:
                     is_valid, error_msg = validate_grade_format(updates[grade_field])
                     if not is_valid:
                         return jsonify(
@@ -289,8 +298,9 @@ def register_admin_student_routes(
             # Get total labs to determine allowed assignment grade fields
             total_labs = get_total_labs_count()
             allowed_fields = get_allowed_assignment_fields(total_labs)
+            allowed_field_set = get_allowed_assignment_field_set(total_labs)
 
-            updates = {k: v for k, v in data.items() if k in allowed_fields or k in ['attendance', 'assignmentGrades', 'teacherEvaluation', 'paymentStatus', 'paymentComment', 'paymentScreenshot', 'resumeLink', 'name']}
+            updates = {k: v for k, v in data.items() if k in allowed_field_set or k in _ADMIN_UPDATE_FIELDS}
 
             if not updates:
                 return (
@@ -311,8 +321,8 @@ def register_admin_student_routes(
                     return jsonify({"error": error_msg}), 400
 
             # Validate grade fields are strings or numbers
-            for grade_field in allowed_fields:
-                if grade_field.startswith("Assignment") and grade_field in updates:
+            for grade_field in updates:
+                if grade_field.startswith("Assignment") and grade_field in allowed_field_set:
                     is_valid, error_msg = validate_grade_format(updates[grade_field])
                     if not is_valid:
                         return jsonify(
@@ -350,65 +360,15 @@ def register_admin_student_routes(
                 logger.error("Google Sheets manager not configured")
                 return jsonify({"error": "Google Sheets manager not configured"}), 500
 
-            data = request.get_json()
-            if not data or "updates" not in data:
-                return (
-                    jsonify({"error": 'Request body must contain "updates" array'}),
-                    400,
-                )
-
-            updates = data["updates"]
-            if not isinstance(updates, list):
-                return jsonify({"error": '"updates" must be an array'}), 400
-
-            if len(updates) == 0:
-                return jsonify({"error": "Updates array cannot be empty"}), 400
-
-            if len(updates) > 100:
-                return jsonify({"error": "Cannot update more than 100 students at once"}), 400
-
             # Get total labs to determine allowed assignment grade fields
             total_labs = get_total_labs_count()
-            allowed_fields = get_allowed_assignment_fields(total_labs)
-
-            # Validate each update has email and valid fields
-            for i, update in enumerate(updates):
-                if not isinstance(update, dict):
-                    return (
-                        jsonify(
-                            {"error": f"Update at index {i} must be an object"}
-                        ),
-                        400,
-                    )
-                if "email" not in update:
-                    return (
-                        jsonify(
-                            {
-                                "error": f'Update at index {i} must have an "email" field'
-                            }
-                        ),
-                        400,
-                    )
-                if not update["email"] or not str(update["email"]).strip():
-                    return (
-                        jsonify(
-                            {"error": f"Update at index {i} has invalid email"}
-                        ),
-                        400,
-                    )
-                # Check for invalid fields
-                invalid_fields = [
-                    k for k in update.keys() if k != "email" and k not in allowed_fields
-                ]
-                if invalid_fields:
-                    return (
-                        jsonify(
-                            {
-                                "error": f'Update at index {i} has invalid fields: {", ".join(invalid_fields)}'
-                            }
-                        ),
-                        400,
-                    )
+            try:
+                updates = validate_bulk_student_updates(
+                    request.get_json(),
+                    get_allowed_assignment_field_set(total_labs),
+                )
+            except ValidationError as e:
+                return jsonify({"error": str(e)}), 400
 
             result = bulk_update_users_admin_data(updates)
             # Handle both old boolean return and new dict return for backward compatibility
@@ -536,8 +496,8 @@ def register_admin_student_routes(
         Get Firestore sync status and latest metrics snapshot.
         """
         try:
-            status = get_sync_status()
-            metrics = get_metrics_from_firestore() or {}
+            status, metrics = get_sync_status_and_metrics()
+            metrics = metrics or {}
 
             return (
                 jsonify(
@@ -574,9 +534,10 @@ def register_admin_student_routes(
             if not sheets_manager:
                 return jsonify({"error": "Google Sheets manager not configured"}), 500
 
-            # Get emails from both Register and Survey
-            register_students = sheets_manager.get_register_students(force_refresh=False)
-            survey_students = sheets_manager.get_survey_students(force_refresh=False)
+            # Get emails from both Register and Survey (read concurrently)
+            register_students, survey_students = sheets_manager.get_all_form_students(
+                force_refresh=False
+            )
 
             emails = []
             seen_emails = set()
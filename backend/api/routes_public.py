@@ -1,15 +1,31 @@
 """
 Public (unauthenticated) API routes.
 """
-import hashlib
-import json
 from typing import Callable, Optional
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 
 from firestore.course_data import get_course_data as get_course_data_from_firestore
 from core.logger import logger
 
+# Course data only changes on admin edits, which bump its version. Clients
+# poll these routes to pick up edits, so caches must revalidate every time;
+# an unchanged version costs a 304 via the ETag instead of the full body.
+COURSE_CACHE_CONTROL = "no-cache"
+
+
+def _with_cache_headers(response, etag: str):
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = COURSE_CACHE_CONTROL
+    return response
+
+
+def _not_modified(etag: str):
+    """Return a 304 response if the client already holds etag, else None."""
+    if request.if_none_match.contains(etag):
+        return _with_cache_headers(current_app.response_class(status=304), etag)
+    return None
+
 
 def register_public_routes(
     api: Blueprint,
@@ -61,6 +77,11 @@ def register_public_routes(
                     200,
                 )
 
+            etag = str(data.get("version", 0))
+            not_modified = _not_modified(etag)
+            if not_modified:
+                return not_modified
+
             normalized = normalize_course_data(data)
 
             # Find primary visible course (first one that is visible)
@@ -77,19 +98,17 @@ def register_public_routes(
 
             if primary_course:
                 # Return flattened structure for frontend compatibility
-                return (
-                    jsonify(
-                        {
-                            "version": normalized.get("version", 0),
-                            "modules": primary_course.get("modules", []),
-                            "links": primary_course.get("links", []),
-                            "metadata": primary_course.get("metadata", {}),
-                        }
-                    ),
-                    200,
+                response = jsonify(
+                    {
+                        "version": normalized.get("version", 0),
+                        "modules": primary_course.get("modules", []),
+                        "links": primary_course.get("links", []),
+                        "metadata": primary_course.get("metadata", {}),
+                    }
                 )
             else:
-                return jsonify({"modules": [], "metadata": {}}), 200
+                response = jsonify({"modules": [], "metadata": {}})
+            return _with_cache_headers(response, etag), 200
 
         except Exception as e:  # pragma: no cover - defensive
             return jsonify({"error": str(e)}), 500
@@ -104,25 +123,14 @@ def register_public_routes(
             if not data:
                 return jsonify({"version": 0}), 200
 
-            version = data.get("version")
-
-            # If no explicit version exists, generate a stable hash from the data
-            if not version:
-                try:
-                    # Create a copy to avoid modifying original
-                    data_copy = data.copy()
-                    # Remove version key if it exists (though it shouldn't if we are here)
-                    data_copy.pop("version", None)
-                    # Generate stable string representation
-                    data_str = json.dumps(data_copy, sort_keys=True)
-                    # Create numeric hash (use first 13 digits to simulate timestamp length)
-                    version = int(
-                        hashlib.sha256(data_str.encode("utf-8")).hexdigest(), 16
-                    ) % (10**13)
-                except Exception:  # pragma: no cover - defensive
-                    version = 0
-
-            return jsonify({"version": version}), 200
+            # get_course_data() guarantees a stored, content-stable version
+            version = data.get("version", 0)
+            etag = str(version)
+            not_modified = _not_modified(etag)
+            if not_modified:
+                return not_modified
+
+            return _with_cache_headers(jsonify({"version": version}), etag), 200
         except Exception as e:  # pragma: no cover - defensive
             return jsonify({"error": str(e)}), 500
 
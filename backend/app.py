@@ -24,8 +24,18 @@ if not env_path.exists() and not root_env_path.exists():
     load_dotenv()
 
 from api.routes import api
+from core.json_provider import OrjsonProvider
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+# Reject oversized bodies (413) before they are read and parsed; the largest
+# legitimate body is the full course JSON
+try:
+    max_request_body_mb = int(os.getenv('MAX_REQUEST_BODY_MB', '10'))
+except ValueError:
+    print("WARNING: MAX_REQUEST_BODY_MB must be an integer number of megabytes; using 10")
+    max_request_body_mb = 10
+app.config['MAX_CONTENT_LENGTH'] = max_request_body_mb * 1024 * 1024
 
 # CORS configuration - require explicit origins (no wildcard default)
 cors_origins = os.getenv('CORS_ORIGINS', '')
@@ -3,7 +3,7 @@ import json
 import base64
 import time
 import hashlib
-from functools import wraps
+from functools import lru_cache, wraps
 from flask import request, jsonify
 import firebase_admin
 from firebase_admin import credentials, auth
@@ -184,15 +184,27 @@ def create_jwt_token():
     }
     return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
+@lru_cache(maxsize=1024)
+def _decode_jwt_token(token):
+    """
+    Verify signature and claims of a token. Invalid tokens raise, so only
+    valid ones are cached; the admin dashboard reuses one token per session.
+    """
+    return jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+
 def verify_jwt_token(token):
     """Verify and decode a JWT token"""
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
+        payload = _decode_jwt_token(token)
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    # A cached payload was only checked for expiry when first decoded
+    exp = payload.get('exp')
+    if exp is not None and exp <= time.time():
+        return None
+    return dict(payload)
 
 def require_auth(f):
     """Decorator to require admin authentication using JWT"""
@@ -0,0 +1,52 @@
+"""JSON provider that parses and serializes Flask JSON with orjson."""
+import dataclasses
+import decimal
+import uuid
+from datetime import date
+from typing import Any
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+# Datetimes are passed through to _default so responses keep Flask's
+# HTTP-date format; non-string keys and numpy values are serialized natively.
+_DUMPS_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_SERIALIZE_NUMPY
+)
+
+
+def _default(o: Any) -> Any:
+    """Mirror Flask's fallbacks for the types orjson leaves to us."""
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Drop-in replacement for Flask's default provider, so every jsonify()
+    call serializes in C and writes bytes straight into the response, and
+    request.get_json() parses the raw body bytes without decoding them first.
+    """
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        # orjson.JSONDecodeError is a ValueError, so Flask's 400 handling
+        # and get_json(silent=True) behave as before
+        return orjson.loads(s)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=_default, option=_DUMPS_OPTIONS).decode()
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=_DUMPS_OPTIONS)
+        return self._app.response_class(body, mimetype=self.mimetype)
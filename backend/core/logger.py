@@ -1,8 +1,13 @@
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
+# Background listeners that drain queued records to file handlers
+_listeners = []
+
 def setup_logger(name: str = 'course_website', log_level: str = None):
     """Setup application logger"""
     logger = logging.getLogger(name)
@@ -40,10 +45,24 @@ def setup_logger(name: str = 'course_website', log_level: str = None):
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    
+    # Request threads only enqueue the record; the listener thread does the
+    # disk writes and rotation so they never block a request
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    if not _listeners:
+        atexit.register(_stop_listeners)
+    _listeners.append(listener)
     
     return logger
 
+def _stop_listeners():
+    """Flush queued records and stop the listener threads at interpreter exit."""
+    while _listeners:
+        _listeners.pop().stop()
+
 # Create default logger instance
 logger = setup_logger()
 
@@ -1,5 +1,5 @@
 """Input validation for API endpoints"""
-from typing import Any, Dict, List, Optional
+from typing import Any, Collection, Dict, List, Optional
 from flask import jsonify
 
 class ValidationError(Exception):
@@ -104,3 +104,35 @@ def validate_course_data(data: Dict[str, Any]) -> Dict[str, Any]:
     
     return data
 
+
+def validate_bulk_student_updates(data: Any, allowed_fields: Collection[str], max_updates: int = 100) -> List[Dict[str, Any]]:
+    """
+    Validate a bulk student update body ({"updates": [...]}) in one pass.
+
+    Each update needs a non-empty email, and any other key must be in
+    allowed_fields. Raises ValidationError for the first problem found.
+    Returns the updates list.
+    """
+    if not isinstance(data, dict) or 'updates' not in data:
+        raise ValidationError('Request body must contain "updates" array')
+
+    updates = data['updates']
+    if not isinstance(updates, list):
+        raise ValidationError('"updates" must be an array')
+    if not updates:
+        raise ValidationError('Updates array cannot be empty')
+    if len(updates) > max_updates:
+        raise ValidationError(f'Cannot update more than {max_updates} students at once')
+
+    for i, update in enumerate(updates):
+        if not isinstance(update, dict):
+            raise ValidationError(f'Update at index {i} must be an object')
+        if 'email' not in update:
+            raise ValidationError(f'Update at index {i} must have an "email" field')
+        if not update['email'] or not str(update['email']).strip():
+            raise ValidationError(f'Update at index {i} has invalid email')
+        invalid_fields = [k for k in update if k != 'email' and k not in allowed_fields]
+        if invalid_fields:
+            raise ValidationError(f'Update at index {i} has invalid fields: {", ".join(invalid_fields)}')
+
+    return updates
@@ -9,13 +9,32 @@ All course data operations should use firestore.course_data instead.
 """
 
 import os
+import copy
 import json
+import threading
+import orjson
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 import io
 
+# Large enough that the course JSON downloads in a single ranged request
+# (the library default of 100 KiB costs one round trip per chunk).
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('GOOGLE_DRIVE_DOWNLOAD_CHUNK_MB', '50')) * 1024 * 1024
+
 class GoogleDriveClient:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls):
+        """Return a lazily-created, process-wide client."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
     def __init__(self):
         self.file_id = os.getenv('GOOGLE_DRIVE_FILE_ID')
         
@@ -64,31 +83,55 @@ class GoogleDriveClient:
             )
         
         self.credentials = credentials
+        self._local = threading.local()
+        # (md5Checksum, parsed data) of the last download
+        self._cache = None
     
     def _get_service(self):
-        """Create a fresh Google Drive service instance per request to avoid SSL errors."""
-        return build('drive', 'v3', credentials=self.credentials, cache_discovery=False)
+        """
+        Return this thread's Drive service, building it on first use.
+
+        httplib2 connections aren't thread-safe (sharing one across threads
+        caused the SSL errors seen before), so each thread keeps its own
+        service and reuses its connection for subsequent requests.
+        """
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build('drive', 'v3', credentials=self.credentials, cache_discovery=False)
+            self._local.service = service
+        return service
     
     def get_course_data(self):
         """Read JSON file from Google Drive"""
         try:
             service = self._get_service()
+
+            # Metadata lookup is tiny; skip the download if content is unchanged
+            meta = service.files().get(
+                fileId=self.file_id, fields='md5Checksum,modifiedTime'
+            ).execute()
+            md5 = meta.get('md5Checksum')
+            cached = self._cache
+            if md5 and cached and cached[0] == md5:
+                return copy.deepcopy(cached[1])
+
             request = service.files().get_media(fileId=self.file_id)
             file_content = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_content, request)
+            downloader = MediaIoBaseDownload(file_content, request, chunksize=DOWNLOAD_CHUNK_SIZE)
             done = False
             while done is False:
                 status, done = downloader.next_chunk()
             
-            file_content.seek(0)
-            content = file_content.read().decode('utf-8')
-            data = json.loads(content)
+            # orjson parses the UTF-8 bytes directly; no decode copy
+            data = orjson.loads(file_content.getvalue())
             
             # Ensure links array exists and has default links if empty
             if not data.get("links") or len(data.get("links", [])) == 0:
                 data["links"] = []
             
-            return data
+            if md5:
+                self._cache = (md5, data)
+            return copy.deepcopy(data)
         except Exception as e:
             print(f"Error reading from Google Drive: {e}")
             # Return default structure if file doesn't exist
@@ -107,9 +150,10 @@ class GoogleDriveClient:
     def update_course_data(self, data):
         """Write JSON file to Google Drive"""
         try:
-            json_data = json.dumps(data, indent=2)
+            # Compact output: the file is machine-managed, so no indentation
+            json_bytes = orjson.dumps(data)
             media = MediaIoBaseUpload(
-                io.BytesIO(json_data.encode('utf-8')),
+                io.BytesIO(json_bytes),
                 mimetype='application/json',
                 resumable=False
             )
@@ -119,6 +163,7 @@ class GoogleDriveClient:
                 fileId=self.file_id,
                 media_body=media
             ).execute()
+            self._cache = None
             
             return True
         except Exception as e:
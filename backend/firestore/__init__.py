@@ -16,6 +16,7 @@ from .operations_cache import (  # noqa: F401
     sanitize_for_firestore,
     set_sync_status,
     sync_students_to_firestore,
+    sync_students_to_firestore_detailed,
 )
 
 
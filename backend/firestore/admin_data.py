@@ -8,21 +8,64 @@ This module stores admin data directly in the users collection (Firebase Auth us
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+import threading
 import uuid
 import json
 
+import cachetools
 import firebase_admin
 from firebase_admin import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
 
 from core.logger import logger
 from firestore.operations_cache import sanitize_for_firestore
+from sheets.sheets_dataframe import find_email_column
 
 # Collection names
 USERS_COLLECTION = "users"
 ADMIN_CLASSES_COLLECTION = "admin_classes"
 
+# Admin/API field name -> Firestore field name for plain (unmerged) fields.
+# Display and Firestore spellings are both accepted; where an update has
+# both, the Firestore spelling (listed second) wins.
+ADMIN_FIELD_MAPPING: Tuple[Tuple[str, str], ...] = (
+    ("Teacher Evaluation", "teacherEvaluation"),
+    ("teacherEvaluation", "teacherEvaluation"),
+    ("Payment Screenshot", "paymentScreenshot"),
+    ("paymentScreenshot", "paymentScreenshot"),
+    ("Payment Status", "paymentStatus"),
+    ("paymentStatus", "paymentStatus"),
+    ("Payment Comment", "paymentComment"),
+    ("paymentComment", "paymentComment"),
+    ("Resume Link", "resumeLink"),
+    ("resumeLink", "resumeLink"),
+    ("Name", "name"),
+    ("name", "name"),
+)
+
+# Normalized email -> UID. A user's UID never changes, so hits are only
+# bounded by size and a TTL that lets deleted users fall out eventually.
+_UID_BY_EMAIL: cachetools.TTLCache = cachetools.TTLCache(maxsize=4096, ttl=600)
+_UID_BY_EMAIL_LOCK = threading.Lock()
+
+# Full user listing for the admin students table. Students also write their
+# own documents from the client, so entries only live briefly; writes made
+# through this module clear it straight away.
+USERS_CACHE_TTL = 30
+_users_cache: cachetools.TTLCache = cachetools.TTLCache(maxsize=1, ttl=USERS_CACHE_TTL)
+_users_cache_lock = threading.Lock()
+
+# Single worker so class purges run one at a time, off the request thread
+_purge_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="class-purge")
+# Class ids queued or running on _purge_executor, so each is purged once
+_pending_purges: set = set()
+_pending_purges_lock = threading.Lock()
+
 
 def _get_firestore_client() -> Optional[firestore.Client]:
     """Return a Firestore client if Firebase Admin is initialized, else None."""
@@ -79,12 +122,20 @@ def _find_user_by_email(email: str) -> Optional[str]:
         if not email_normalized:
             return None
         
+        with _UID_BY_EMAIL_LOCK:
+            uid = _UID_BY_EMAIL.get(email_normalized)
+        if uid:
+            return uid
+        
         # Query users collection by email field
         users_ref = client.collection(USERS_COLLECTION)
         query = users_ref.where('email', '==', email_normalized).limit(1)
         docs = query.stream()
         
         for doc in docs:
+            # Only hits are cached so new sign-ups are found on the next call
+            with _UID_BY_EMAIL_LOCK:
+                _UID_BY_EMAIL[email_normalized] = doc.id
             return doc.id  # Return the UID (document ID)
         
         return None
@@ -143,19 +194,42 @@ def get_user_admin_data_by_email(email: str) -> Optional[Dict[str, Any]]:
     return get_user_admin_data(uid)
 
 
-def get_all_users_admin_data() -> List[Dict[str, Any]]:
+def invalidate_users_cache() -> None:
+    """Drop the cached user listing after user documents change."""
+    with _users_cache_lock:
+        _users_cache.clear()
+
+
+def get_all_users_admin_data(
+    fields: Optional[List[str]] = None, use_cache: bool = False
+) -> List[Dict[str, Any]]:
     """
     Read all Firebase users with their admin data.
 
+    Args:
+        fields: Optional field paths to project. Only these fields are sent
+            over the wire; users with none of them set are omitted.
+        use_cache: Serve a full listing (no fields) read within the last
+            USERS_CACHE_TTL seconds. The returned list is shared; don't mutate it.
+
     Returns:
         List of user documents with admin data fields
     """
+    use_cache = use_cache and not fields
+    if use_cache:
+        with _users_cache_lock:
+            cached = _users_cache.get("all")
+        if cached is not None:
+            return cached
+
     client = _get_firestore_client()
     if not client:
         return []
 
     try:
         users_ref = client.collection(USERS_COLLECTION)
+        if fields:
+            users_ref = users_ref.select(fields)
         docs = users_ref.stream()
 
         result = []
@@ -166,77 +240,13 @@ def get_all_users_admin_data() -> List[Dict[str, Any]]:
                 result.append(data)
 
         logger.debug(f"Read {len(result)} users from Firestore")
+        if use_cache:
+            with _users_cache_lock:
+                _users_cache["all"] = result
         return result
     except Exception as exc:
         logger.error(f"Error reading all users: {exc}", exc_info=True)
         return []
-def _sync_assignment_fields_for_user(
-    uid: str,
-    course_module_structure: Dict[str, Dict[str, int]],
-    existing_data: Dict[str, Any]
-) -> None:
-    """
-    Sync assignment fields for a single user to match course/module structure.
-    
-    Args:
-        uid: Firebase user UID
-        course_module_structure: Dict mapping course_id -> {module_id -> lab_count}
-        existing_data: Existing user data
-    """
-    client = _get_firestore_client()
-    if not client:
-        return
-    
-    try:
-        existing_grades = existing_data.get('assignmentGrades', {})
-        if not isinstance(existing_grades, dict):
-            existing_grades = {}
-        
-        updated_grades = {}
-        needs_update = False
-        
-        # Build new structure based on course/module structure
-        for course_id, modules in course_module_structure.items():
-            updated_grades[course_id] = {}
-            for module_id, lab_count in modules.items():
-                updated_grades[course_id][module_id] = {}
-                
-                # Preserve existing grades if they exist
-                existing_course = existing_grades.get(course_id, {})
-                existing_module = existing_course.get(module_id, {}) if isinstance(existing_course, dict) else {}
-                
-                for lab_num in range(1, lab_count + 1):
-                    lab_key = f"lab{lab_num}"
-                    # Preserve existing grade if available
-                    if isinstance(existing_module, dict) and lab_key in existing_module:
-                        updated_grades[course_id][module_id][lab_key] = existing_module[lab_key]
-                    else:
-                        updated_grades[course_id][module_id][lab_key] = ""
-                        needs_update = True
-        
-        # Check if structure changed (removed courses/modules)
-        for course_id in existing_grades.keys():
-            if course_id not in course_module_structure:
-                needs_update = True
-                break
-            existing_course = existing_grades.get(course_id, {})
-            if isinstance(existing_course, dict):
-                for module_id in existing_course.keys():
-                    if module_id not in course_module_structure.get(course_id, {}):
-                        needs_update = True
-                        break
-        
-        if needs_update:
-            doc_ref = client.collection(USERS_COLLECTION).document(uid)
-            doc_ref.update({
-                'assignmentGrades': updated_grades,
-                'updatedAt': datetime.now(timezone.utc)
-            })
-            logger.debug(f"Synced assignment fields for user: {uid}")
-    except Exception as exc:
-        logger.error(f"Error syncing assignment fields for {uid}: {exc}", exc_info=True)
-
-
 def _convert_old_format_to_new_format(
     old_format_grades: Dict[str, str],
     course_module_structure: Dict[str, Dict[str, int]]
@@ -329,20 +339,21 @@ def update_user_admin_data(uid: str, updates: Dict[str, Any]) -> bool:
 
         uid = uid.strip()
         
-        # Ensure user exists and has admin fields initialized
-        user_data = get_user_admin_data(uid)
-        if not user_data:
-            logger.warning(f"User {uid} not found in Firestore")
-            return False
-        
-        # Ensure admin fields are initialized
-        _ensure_user_admin_fields(uid)
-        
-        # Get existing document
+        # One snapshot serves the existence check and every merge below
         doc_ref = client.collection(USERS_COLLECTION).document(uid)
         existing_doc = doc_ref.get()
+        if not existing_doc.exists:
+            logger.warning(f"User {uid} not found in Firestore")
+            return False
+        existing_data = existing_doc.to_dict() or {}
+
+        # Initialize missing admin fields as part of this same write; merges
+        # below see the defaults as if they were already stored
+        admin_defaults = _missing_admin_fields(existing_data)
+        existing_data = {**admin_defaults, **existing_data}
 
         update_data: Dict[str, Any] = {
+            **admin_defaults,
             "updatedAt": datetime.now(timezone.utc),
         }
 
@@ -352,7 +363,6 @@ def update_user_admin_data(uid: str, updates: Dict[str, Any]) -> bool:
             if isinstance(attendance, dict):
                 # Merge with existing attendance if present
                 if existing_doc.exists:
-                    existing_data = existing_doc.to_dict() or {}
                     existing_attendance = existing_data.get("attendance", {})
                     if isinstance(existing_attendance, dict):
                         existing_attendance.update(attendance)
@@ -365,7 +375,6 @@ def update_user_admin_data(uid: str, updates: Dict[str, Any]) -> bool:
 
                     attendance_dict = json.loads(attendance)
                     if existing_doc.exists:
-                        existing_data = existing_doc.to_dict() or {}
                         existing_attendance = existing_data.get("attendance", {})
                         if isinstance(existing_attendance, dict):
                             existing_attendance.update(attendance_dict)
@@ -381,7 +390,6 @@ def update_user_admin_data(uid: str, updates: Dict[str, Any]) -> bool:
             new_grades = updates.get("assignmentGrades")
             if isinstance(new_grades, dict):
                 if existing_doc.exists:
-                    existing_data = existing_doc.to_dict() or {}
                     existing_grades = existing_data.get("assignmentGrades", {})
                     if isinstance(existing_grades, dict):
                         # Deep merge: preserve existing structure and update with new values
@@ -409,7 +417,6 @@ def update_user_admin_data(uid: str, updates: Dict[str, Any]) -> bool:
         # If we have old format updates, convert them to new format and merge
         if assignment_updates_old_format:
             if existing_doc.exists:
-                existing_data = existing_doc.to_dict() or {}
                 existing_grades = existing_data.get("assignmentGrades", {})
                 
                 # Check if existing structure is old format (flat) or new format (nested)
@@ -466,22 +473,7 @@ def update_user_admin_data(uid: str, updates: Dict[str, Any]) -> bool:
                     update_data["assignmentGrades"] = assignment_updates_old_format
 
         # Handle other fields
-        field_mapping = {
-            "Teacher Evaluation": "teacherEvaluation",
-            "teacherEvaluation": "teacherEvaluation",
-            "Payment Screenshot": "paymentScreenshot",
-            "paymentScreenshot": "paymentScreenshot",
-            "Resume Link": "resumeLink",
-            "resumeLink": "resumeLink",
-            "Name": "name",
-            "name": "name",
-            "Payment Status": "paymentStatus",
-            "paymentStatus": "paymentStatus",
-            "Payment Comment": "paymentComment",
-            "paymentComment": "paymentComment",
-        }
-
-        for key, firestore_key in field_mapping.items():
+        for key, firestore_key in ADMIN_FIELD_MAPPING:
             if key in updates:
                 update_data[firestore_key] = updates[key]
 
@@ -490,6 +482,7 @@ def update_user_admin_data(uid: str, updates: Dict[str, Any]) -> bool:
 
         # Update document
         doc_ref.update(update_data)
+        invalidate_users_cache()
 
         logger.info(f"Updated user admin data: {uid}")
         return True
@@ -516,6 +509,86 @@ def update_user_admin_data_by_email(email: str, updates: Dict[str, Any]) -> bool
     return update_user_admin_data(uid, updates)
 
 
+def _prefetch_uids_by_email(emails: List[str]) -> Dict[str, str]:
+    """
+    Resolve many emails to UIDs with one projected scan of the users collection.
+    
+    Emails already in the UID cache are answered from it; the rest come from
+    a single email-only stream instead of one query per email.
+    
+    Returns:
+        Dict of normalized email -> UID for the emails that were found
+    """
+    wanted = {e for e in (_normalize_email(email) for email in emails) if e}
+    resolved: Dict[str, str] = {}
+    with _UID_BY_EMAIL_LOCK:
+        for email in wanted:
+            uid = _UID_BY_EMAIL.get(email)
+            if uid:
+                resolved[email] = uid
+    missing = wanted - resolved.keys()
+    if not missing:
+        return resolved
+    
+    for user in get_all_users_admin_data(fields=["email"]):
+        email = _normalize_email(user.get("email", ""))
+        if email in missing and email not in resolved:
+            resolved[email] = user["_id"]
+    
+    with _UID_BY_EMAIL_LOCK:
+        for email in missing & resolved.keys():
+            _UID_BY_EMAIL[email] = resolved[email]
+    return resolved
+
+
+def _attendance_path(class_id: str) -> str:
+    """Return the escaped field path of one class inside a user's attendance map."""
+    return FieldPath("attendance", str(class_id)).to_api_repr()
+
+
+def set_class_attendance(class_id: str, status_by_uid: Dict[str, bool]) -> Dict[str, Any]:
+    """
+    Set one class's attendance flag for many users without reading them first.
+    
+    Each user gets a single attendance.<class_id> field-path write (plus
+    updatedAt), batched 500 per commit, so the rest of the attendance map
+    and the other admin fields are left untouched.
+    
+    Args:
+        class_id: Class whose attendance is being set
+        status_by_uid: Dict mapping user UID -> present (True/False)
+        
+    Returns:
+        Dict with stats: {'success': bool, 'updated': int, 'failed': int}
+    """
+    client = _get_firestore_client()
+    if not client:
+        logger.error("Firestore client not available")
+        return {'success': False, 'updated': 0, 'failed': len(status_by_uid)}
+    
+    stats = {'updated': 0, 'failed': 0}
+    field_path = _attendance_path(class_id)
+    users_ref = client.collection(USERS_COLLECTION)
+    items = list(status_by_uid.items())
+    batch_size = 500
+    
+    for batch_start in range(0, len(items), batch_size):
+        chunk = items[batch_start:batch_start + batch_size]
+        batch = client.batch()
+        now = datetime.now(timezone.utc)
+        for uid, present in chunk:
+            batch.update(users_ref.document(uid), {field_path: bool(present), "updatedAt": now})
+        try:
+            batch.commit()
+            stats['updated'] += len(chunk)
+        except Exception as exc:
+            logger.error(f"Error committing attendance batch for class {class_id}: {exc}", exc_info=True)
+            stats['failed'] += len(chunk)
+    
+    invalidate_users_cache()
+    return {'success': stats['failed'] == 0, **stats}
+
+
 def bulk_update_users_admin_data(updates: List[Dict[str, Any]], course_module_structure: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Any]:
     """
     Batch update admin data for multiple Firebase users.
@@ -545,6 +618,10 @@ def bulk_update_users_admin_data(updates: List[Dict[str, Any]], course_module_st
     
     stats = {'updated': 0, 'failed': 0, 'skipped': 0}
 
+    # Resolve email-only updates up front rather than querying per update
+    emails_to_resolve = [u["email"] for u in updates if not u.get("uid") and u.get("email")]
+    uids_by_email = _prefetch_uids_by_email(emails_to_resolve) if len(emails_to_resolve) > 1 else None
+
     try:
         # Firestore batch limit is 500 operations
         batch_size = 500
@@ -564,27 +641,33 @@ def bulk_update_users_admin_data(updates: List[Dict[str, Any]], course_module_st
                 email = update.get("email")
                 
                 if not uid and email:
-                    uid = _find_user_by_email(email)
+                    if uids_by_email is not None:
+                        uid = uids_by_email.get(_normalize_email(email))
+                    else:
+                        uid = _find_user_by_email(email)
                 
                 if not uid:
-                    logger.warning(f"Update missing uid/email, skipping")
+                    logger.warning("Update missing uid/email, skipping")
                     stats['skipped'] += 1
                     continue
 
-                # Ensure user exists and has admin fields
-                user_data = get_user_admin_data(uid)
-                if not user_data:
-                    logger.warning(f"User {uid} not found, skipping")
+                # Single read per user: existence check, admin-field defaults
+                # and all merges below work off this one snapshot
+                doc_ref = client.collection(USERS_COLLECTION).document(uid)
+                existing_doc = doc_ref.get()
+                if not existing_doc.exists:
+                    logger.warning("User %s not found, skipping", uid)
                     stats['skipped'] += 1
                     continue
-                
-                # Ensure admin fields are initialized
-                _ensure_user_admin_fields(uid, course_module_structure)
+                existing_data = existing_doc.to_dict() or {}
 
-                doc_ref = client.collection(USERS_COLLECTION).document(uid)
+                # Initialize missing admin fields in the same batched write
+                admin_defaults = _missing_admin_fields(existing_data, course_module_structure)
+                existing_data = {**admin_defaults, **existing_data}
 
                 # Build update data (similar to update_admin_student logic)
                 update_data: Dict[str, Any] = {
+                    **admin_defaults,
                     "updatedAt": datetime.now(timezone.utc),
                 }
 
@@ -592,24 +675,24 @@ def bulk_update_users_admin_data(updates: List[Dict[str, Any]], course_module_st
                 if "Attendance" in update or "attendance" in update:
                     attendance = update.get("Attendance") or update.get("attendance")
                     if isinstance(attendance, dict):
-                        # Try to merge with existing
-                        existing_doc = doc_ref.get()
-                        if existing_doc.exists:
-                            existing_data = existing_doc.to_dict() or {}
-                            existing_attendance = existing_data.get("attendance", {})
-                            if isinstance(existing_attendance, dict):
-                                existing_attendance.update(attendance)
-                                attendance = existing_attendance
-                        update_data["attendance"] = attendance
+                        existing_attendance = existing_data.get("attendance", {})
+                        if "attendance" in update_data or not isinstance(existing_attendance, dict):
+                            # Map is being created (or replaced) in this write
+                            base = existing_attendance if isinstance(existing_attendance, dict) else {}
+                            update_data["attendance"] = {**base, **attendance}
+                        else:
+                            # Write only the classes whose value changed, as
+                            # attendance.<class_id> paths, instead of the whole map
+                            for class_id, present in attendance.items():
+                                if existing_attendance.get(class_id) != present:
+                                    update_data[_attendance_path(class_id)] = present
 
                 # Handle assignment grades - support both old and new formats
                 if "assignmentGrades" in update:
                     # New format: per-course/module structure
                     new_grades = update.get("assignmentGrades")
                     if isinstance(new_grades, dict):
-                        existing_doc = doc_ref.get()
                         if existing_doc.exists:
-                            existing_data = existing_doc.to_dict() or {}
                             existing_grades = existing_data.get("assignmentGrades", {})
                             if isinstance(existing_grades, dict):
                                 merged_grades = _deep_merge_assignment_grades(existing_grades, new_grades)
@@ -626,9 +709,7 @@ def bulk_update_users_admin_data(updates: List[Dict[str, Any]], course_module_st
                         assignment_updates_old_format[key] = str(value) if value is not None else ""
 
                 if assignment_updates_old_format:
-                    existing_doc = doc_ref.get()
                     if existing_doc.exists:
-                        existing_data = existing_doc.to_dict() or {}
                         existing_grades = existing_data.get("assignmentGrades", {})
                         
                         # Check if existing structure is old format (flat) or new format (nested)
@@ -656,7 +737,7 @@ def bulk_update_users_admin_data(updates: List[Dict[str, Any]], course_module_st
                                 update_data["assignmentGrades"] = merged_grades
                             else:
                                 # No course structure available, keep old format temporarily
-                                logger.warning(f"Received old format assignment updates but no course structure available. Storing in old format.")
+                                logger.warning("Received old format assignment updates but no course structure available. Storing in old format.")
                                 if isinstance(existing_grades, dict):
                                     existing_grades.update(assignment_updates_old_format)
                                     update_data["assignmentGrades"] = existing_grades
@@ -675,22 +756,7 @@ def bulk_update_users_admin_data(updates: List[Dict[str, Any]], course_module_st
                             update_data["assignmentGrades"] = assignment_updates_old_format
 
                 # Handle other fields
-                field_mapping = {
-                    "Teacher Evaluation": "teacherEvaluation",
-                    "teacherEvaluation": "teacherEvaluation",
-                    "Payment Screenshot": "paymentScreenshot",
-                    "paymentScreenshot": "paymentScreenshot",
-                    "Payment Status": "paymentStatus",
-                    "paymentStatus": "paymentStatus",
-                    "Payment Comment": "paymentComment",
-                    "paymentComment": "paymentComment",
-                    "Resume Link": "resumeLink",
-                    "resumeLink": "resumeLink",
-                    "Name": "name",
-                    "name": "name",
-                }
-
-                for key, firestore_key in field_mapping.items():
+                for key, firestore_key in ADMIN_FIELD_MAPPING:
                     if key in update:
                         update_data[firestore_key] = update[key]
 
@@ -710,6 +776,7 @@ def bulk_update_users_admin_data(updates: List[Dict[str, Any]], course_module_st
                     stats['failed'] += batch_count
                     stats['updated'] -= batch_count
 
+        invalidate_users_cache()
         logger.info(
             f"Bulk update completed: {stats['updated']} updated, "
             f"{stats['failed']} failed, {stats['skipped']} skipped"
@@ -725,6 +792,40 @@ def bulk_update_users_admin_data(updates: List[Dict[str, Any]], course_module_st
         return {'success': False, 'updated': stats['updated'], 'failed': stats['failed'] + len(updates) - stats['updated'] - stats['skipped'], 'skipped': stats['skipped']}
 
 
+@lru_cache(maxsize=32)
+def _resolve_register_columns(columns: Tuple[str, ...]) -> Mapping[str, Optional[str]]:
+    """
+    Map Register headers to the columns used for payment/resume backups.
+    
+    Cached per header tuple: the form's headers rarely change, so the
+    substring scan over every column runs once instead of on each sync.
+    
+    Returns:
+        Read-only mapping with 'payment_screenshot', 'payment_proved', 'resume'
+        and 'email' keys (None where no matching column exists); read-only
+        because the cached object is shared by every caller
+    """
+    resolved: Dict[str, Optional[str]] = {
+        'payment_screenshot': None,
+        'payment_proved': None,
+        'resume': None,
+        'email': None,
+    }
+    for col in columns:
+        col_lower = str(col).lower()
+        if "payment" in col_lower and "screenshot" in col_lower:
+            resolved['payment_screenshot'] = col
+        elif "payment" in col_lower and "proved" in col_lower:
+            resolved['payment_proved'] = col
+        if "resume" in col_lower and ("upload" in col_lower or "link" in col_lower):
+            resolved['resume'] = col
+    # Prefer an exact email header; fall back to any header mentioning email
+    resolved['email'] = find_email_column(columns) or next(
+        (col for col in columns if "email" in str(col).lower()), None
+    )
+    return MappingProxyType(resolved)
+
+
 def sync_payment_backups_to_firestore(register_df) -> bool:
     """
     Sync payment screenshots and resume links from Register to Firestore users collection.
@@ -746,96 +847,98 @@ def sync_payment_backups_to_firestore(register_df) -> bool:
     try:
         import pandas as pd
 
-        # Find Register columns
-        payment_screenshot_col = None
-        payment_proved_col = None
-        resume_col = None
-
-        for col in register_df.columns:
-            col_lower = str(col).lower()
-            if "payment" in col_lower and "screenshot" in col_lower:
-                payment_screenshot_col = col
-            elif "payment" in col_lower and "proved" in col_lower:
-                payment_proved_col = col
-            if "resume" in col_lower and ("upload" in col_lower or "link" in col_lower):
-                resume_col = col
+        # Find Register columns (cached per header set)
+        columns = _resolve_register_columns(tuple(register_df.columns))
+        payment_screenshot_col = columns['payment_screenshot']
+        payment_proved_col = columns['payment_proved']
+        resume_col = columns['resume']
 
         if not payment_screenshot_col and not payment_proved_col and not resume_col:
             logger.debug("No payment/resume columns found in Register")
             return True
 
-        # Find email column
-        email_col = None
-        for col in register_df.columns:
-            if "email" in str(col).lower():
-                email_col = col
-                break
-
+        email_col = columns['email']
         if not email_col:
             logger.warning("No email column found in Register")
             return False
 
-        updates = []
-        for _, row in register_df.iterrows():
-            email = str(row.get(email_col, "")).strip()
-            if not email:
-                continue
-
-            email_normalized = _normalize_email(email)
-            if not email_normalized:
-                continue
-
-            # Find Firebase user by email
-            uid = _find_user_by_email(email_normalized)
-            if not uid:
-                logger.debug(f"No Firebase user found for email: {email_normalized}")
-                continue
+        def _text(values: Optional[pd.Series]) -> pd.Series:
+            """Stripped text of a column; missing/'nan' cells become ''."""
+            if values is None:
+                return pd.Series("", index=register_df.index, dtype="string")
+            values = values.astype("string").str.strip()
+            return values.mask(values.str.lower() == "nan", "").fillna("")
+
+        def _emails(values: pd.Series) -> pd.Series:
+            """Normalized emails, with anything _normalize_email would reject as ''."""
+            emails = _text(values).str.lower()
+            return emails.where((emails.str.len() >= 3) & emails.str.contains("@", regex=False), "")
+
+        # Load all users once and index by email instead of a query + read per row
+        users = pd.DataFrame(get_all_users_admin_data(
+            fields=["email", "paymentStatus", "paymentScreenshot", "resumeLink"]
+        ))
+        if users.empty or "email" not in users.columns:
+            logger.debug("No Firebase users found, skipping payment backup sync")
+            return True
 
-            # Get existing user data
-            user_data = get_user_admin_data(uid)
-            if not user_data:
-                logger.debug(f"User {uid} not found in Firestore")
-                continue
+        def _is_set(col: str) -> pd.Series:
+            if col not in users.columns:
+                return pd.Series(False, index=users.index)
+            return users[col].fillna("").astype(bool)
+
+        users = pd.DataFrame({
+            "email": _emails(users["email"]),
+            "uid": users["_id"],
+            "has_status": _is_set("paymentStatus"),
+            "has_screenshot": _is_set("paymentScreenshot"),
+            "has_resume": _is_set("resumeLink"),
+        })
+        users = users[users["email"] != ""].drop_duplicates("email", keep="first")
+
+        # Normalize the Register columns in one vectorized pass each
+        reg = pd.DataFrame({
+            "email": _emails(register_df[email_col]),
+            "proved": _text(register_df[payment_proved_col] if payment_proved_col else None).str.lower(),
+            "screenshot": _text(register_df[payment_screenshot_col] if payment_screenshot_col else None),
+            "resume": _text(register_df[resume_col] if resume_col else None),
+        })
+        reg = reg[reg["email"] != ""]
+
+        merged = reg.merge(users, on="email", how="inner")
+
+        # Only fill what the admin hasn't already set; yes/no -> Paid/Unpaid
+        status = merged["proved"].map({"yes": "Paid", "no": "Unpaid"})
+        merged["paymentStatus"] = status.where(~merged["has_status"])
+        merged["paymentScreenshot"] = merged["screenshot"].where(
+            (merged["screenshot"] != "") & ~merged["has_screenshot"]
+        )
+        merged["resumeLink"] = merged["resume"].where(
+            (merged["resume"] != "") & ~merged["has_resume"]
+        )
 
-            update_needed = False
-            update_data: Dict[str, Any] = {"uid": uid}
-
-            # Check Payment proved column (yes/no -> Paid/Unpaid)
-            # Only set if admin hasn't already set a payment status
-            if payment_proved_col and not user_data.get("paymentStatus"):
-                payment_proved_val = str(row.get(payment_proved_col, "")).strip().lower()
-                if payment_proved_val and payment_proved_val != "nan":
-                    # Map yes/no to Paid/Unpaid
-                    if payment_proved_val == "yes":
-                        update_data["paymentStatus"] = "Paid"
-                        update_needed = True
-                    elif payment_proved_val == "no":
-                        update_data["paymentStatus"] = "Unpaid"
-                        update_needed = True
-
-            # Check payment screenshot
-            if payment_screenshot_col:
-                payment_val = str(row.get(payment_screenshot_col, "")).strip()
-                if payment_val and payment_val.lower() != "nan":
-                    if not user_data.get("paymentScreenshot"):
-                        update_data["paymentScreenshot"] = payment_val
-                        update_needed = True
-
-            # Check resume link
-            if resume_col:
-                resume_val = str(row.get(resume_col, "")).strip()
-                if resume_val and resume_val.lower() != "nan":
-                    if not user_data.get("resumeLink"):
-                        update_data["resumeLink"] = resume_val
-                        update_needed = True
-
-            if update_needed:
-                updates.append(update_data)
+        # Rows where every mask is False are already synced; drop them before
+        # building any Python objects
+        fields = ("paymentStatus", "paymentScreenshot", "resumeLink")
+        needed = merged[list(fields)].notna()
+        pending = merged[needed.any(axis=1)]
+        flags = needed.loc[pending.index]
+        updates = []
+        for uid, values, row_flags in zip(
+            pending["uid"],
+            pending[list(fields)].itertuples(index=False, name=None),
+            flags.itertuples(index=False, name=None),
+        ):
+            update = {"uid": uid}
+            for field, value, flag in zip(fields, values, row_flags):
+                if flag:
+                    update[field] = value
+            updates.append(update)
 
         if updates:
-            success = bulk_update_users_admin_data(updates)
+            result = bulk_update_users_admin_data(updates)
             logger.info(f"Synced payment/resume backups for {len(updates)} users")
-            return success
+            return result.get('success', False)
 
         return True
     except Exception as exc:
@@ -866,9 +969,15 @@ def get_all_classes() -> List[Dict[str, Any]]:
         classes = []
         for doc in docs:
             data = doc.to_dict()
-            if data:
-                data["_id"] = doc.id  # Include document ID
-                classes.append(data)
+            if not data:
+                continue
+            if data.get("deleted"):
+                # Tombstoned class: hide it, and resume its purge if an
+                # earlier process stopped before finishing it
+                _schedule_purge(doc.id)
+                continue
+            data["_id"] = doc.id  # Include document ID
+            classes.append(data)
 
         # Sort by date if available
         classes.sort(key=lambda x: x.get("date", ""), reverse=True)
@@ -925,6 +1034,12 @@ def delete_class(class_id: str) -> bool:
     """
     Delete class from Firestore and remove attendance records for this class from all users.
 
+    The class is tombstoned (deleted=True) with a single write, so it
+    disappears from get_all_classes() immediately; removing its attendance
+    entries from every user and deleting the class document then runs in
+    the background. If the process stops first, get_all_classes() resumes
+    the purge the next time it sees the tombstone.
+
     Args:
         class_id: Class identifier (document ID)
 
@@ -941,31 +1056,49 @@ def delete_class(class_id: str) -> bool:
         doc_ref = client.collection(ADMIN_CLASSES_COLLECTION).document(class_id)
         doc = doc_ref.get()
 
-        if not doc.exists:
+        if not doc.exists or (doc.to_dict() or {}).get("deleted"):
             logger.warning(f"Class {class_id} not found")
             return False
 
-        # Remove attendance records for this class from all users
+        doc_ref.update({"deleted": True, "deletedAt": firestore.SERVER_TIMESTAMP})
+        _schedule_purge(class_id)
+        logger.info(f"Deleted class: {class_id} (attendance purge scheduled)")
+        return True
+    except Exception as exc:
+        logger.error(f"Error deleting class {class_id}: {exc}", exc_info=True)
+        return False
+
+
+def _purge_class(class_id: str) -> bool:
+    """
+    Remove a tombstoned class's attendance entries from all users, then its document.
+
+    Returns:
+        True if the class was fully purged, False otherwise
+    """
+    client = _get_firestore_client()
+    if not client:
+        return False
+
+    try:
+        # Only the attendance.<class_id> entry is fetched; users without it
+        # come back empty and are skipped.
+        field_path = _attendance_path(class_id)
         users_ref = client.collection(USERS_COLLECTION)
-        users_docs = users_ref.stream()
+        users_docs = users_ref.select([field_path]).stream()
         
         batch = client.batch()
         batch_count = 0
         updated_count = 0
         
         for user_doc in users_docs:
-            user_data = user_doc.to_dict() or {}
-            attendance = user_data.get('attendance', {})
+            attendance = (user_doc.to_dict() or {}).get('attendance')
             
             # Check if this user has attendance for the deleted class
             if isinstance(attendance, dict) and class_id in attendance:
-                # Remove the class_id from attendance by updating the entire attendance dict
-                updated_attendance = attendance.copy()
-                del updated_attendance[class_id]
-                
-                user_doc_ref = client.collection(USERS_COLLECTION).document(user_doc.id)
-                batch.update(user_doc_ref, {
-                    'attendance': updated_attendance,
+                # Delete just that entry instead of rewriting the whole map
+                batch.update(user_doc.reference, {
+                    field_path: firestore.DELETE_FIELD,
                     'updatedAt': datetime.now(timezone.utc)
                 })
                 batch_count += 1
@@ -980,95 +1113,91 @@ def delete_class(class_id: str) -> bool:
         # Commit remaining updates
         if batch_count > 0:
             batch.commit()
+        invalidate_users_cache()
         
         if updated_count > 0:
             logger.info(f"Removed attendance records for class {class_id} from {updated_count} users")
         
         # Now delete the class document
-        doc_ref.delete()
-        logger.info(f"Deleted class: {class_id}")
+        client.collection(ADMIN_CLASSES_COLLECTION).document(class_id).delete()
+        logger.info(f"Purged class: {class_id}")
         return True
     except Exception as exc:
-        logger.error(f"Error deleting class {class_id}: {exc}", exc_info=True)
+        logger.error(f"Error purging class {class_id}: {exc}", exc_info=True)
         return False
 
 
+def _schedule_purge(class_id: str) -> None:
+    """Queue _purge_class for class_id unless it is already queued."""
+    with _pending_purges_lock:
+        if class_id in _pending_purges:
+            return
+        _pending_purges.add(class_id)
+    _purge_executor.submit(_run_purge, class_id)
+
+
+def _run_purge(class_id: str) -> None:
+    try:
+        _purge_class(class_id)
+    finally:
+        with _pending_purges_lock:
+            _pending_purges.discard(class_id)
+
+
 # ---------------------------------------------------------------------------
 # Helper Functions
 # ---------------------------------------------------------------------------
 
 
-def _ensure_user_admin_fields(uid: str, course_module_structure: Optional[Dict[str, Dict[str, int]]] = None) -> None:
+def _missing_admin_fields(
+    existing_data: Dict[str, Any],
+    course_module_structure: Optional[Dict[str, Dict[str, int]]] = None,
+) -> Dict[str, Any]:
     """
-    Ensure user document has admin fields initialized.
+    Return default values for admin fields missing from a user document.
     
     Args:
-        uid: Firebase user UID
+        existing_data: Current user document data
         course_module_structure: Optional course/module structure for initializing assignment fields
-            If None, will fetch from Firestore course data
+            If None, will fetch from Firestore course data (only when needed)
+        
+    Returns:
+        Dict of field -> default value; empty if nothing is missing
     """
-    client = _get_firestore_client()
-    if not client:
-        return
+    defaults: Dict[str, Any] = {}
     
-    try:
-        doc_ref = client.collection(USERS_COLLECTION).document(uid)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-            return
-        
-        existing_data = doc.to_dict() or {}
-        needs_update = False
-        update_data: Dict[str, Any] = {}
-        
-        # Initialize attendance if missing
-        if 'attendance' not in existing_data:
-            update_data['attendance'] = {}
-            needs_update = True
-        
-        # Initialize assignmentGrades if missing
-        if 'assignmentGrades' not in existing_data:
-            # Get course/module structure if not provided
-            if course_module_structure is None:
-                from firestore.course_data import get_course_data as get_course_data_from_firestore
-                from students.student_helpers import get_course_module_structure
-                course_data = get_course_data_from_firestore()
-                course_module_structure = get_course_module_structure(course_data)
-            
-            if course_module_structure:
-                # Initialize with empty structure
-                assignment_grades = {}
-                for course_id, modules in course_module_structure.items():
-                    assignment_grades[course_id] = {}
-                    for module_id, lab_count in modules.items():
-                        assignment_grades[course_id][module_id] = {}
-                        for lab_num in range(1, lab_count + 1):
-                            assignment_grades[course_id][module_id][f"lab{lab_num}"] = ""
-                update_data['assignmentGrades'] = assignment_grades
-            else:
-                update_data['assignmentGrades'] = {}
-            needs_update = True
-        
-        # Initialize other fields if missing
-        if 'teacherEvaluation' not in existing_data:
-            update_data['teacherEvaluation'] = ''
-            needs_update = True
-        
-        if 'paymentStatus' not in existing_data:
-            update_data['paymentStatus'] = ''
-            needs_update = True
-        
-        if 'paymentComment' not in existing_data:
-            update_data['paymentComment'] = ''
-            needs_update = True
+    # Initialize attendance if missing
+    if 'attendance' not in existing_data:
+        defaults['attendance'] = {}
+    
+    # Initialize assignmentGrades if missing
+    if 'assignmentGrades' not in existing_data:
+        # Get course/module structure if not provided
+        if course_module_structure is None:
+            from firestore.course_data import get_course_data as get_course_data_from_firestore
+            from students.student_helpers import get_course_module_structure
+            course_data = get_course_data_from_firestore()
+            course_module_structure = get_course_module_structure(course_data)
         
-        if needs_update:
-            update_data['updatedAt'] = datetime.now(timezone.utc)
-            doc_ref.update(update_data)
-            logger.debug(f"Initialized admin fields for user: {uid}")
-    except Exception as exc:
-        logger.error(f"Error ensuring admin fields for {uid}: {exc}", exc_info=True)
+        if course_module_structure:
+            # Initialize with empty structure
+            assignment_grades = {}
+            for course_id, modules in course_module_structure.items():
+                assignment_grades[course_id] = {}
+                for module_id, lab_count in modules.items():
+                    assignment_grades[course_id][module_id] = {}
+                    for lab_num in range(1, lab_count + 1):
+                        assignment_grades[course_id][module_id][f"lab{lab_num}"] = ""
+            defaults['assignmentGrades'] = assignment_grades
+        else:
+            defaults['assignmentGrades'] = {}
+    
+    # Initialize other fields if missing
+    for field in ('teacherEvaluation', 'paymentStatus', 'paymentComment'):
+        if field not in existing_data:
+            defaults[field] = ''
+    
+    return defaults
 
 
 # ---------------------------------------------------------------------------
@@ -1084,6 +1213,7 @@ def sync_assignment_fields_to_lab_count(course_module_structure: Optional[Dict[s
     - Adds missing assignment fields for new courses/modules
     - Removes orphaned assignment fields for removed courses/modules
     - Preserves existing grades
+    - Initializes any other missing admin fields in the same batched write
     
     Args:
         course_module_structure: Dict mapping course_id -> {module_id -> lab_count}
@@ -1167,13 +1297,21 @@ def sync_assignment_fields_to_lab_count(course_module_structure: Optional[Dict[s
                                 updated = True
                                 stats['removed'] += 1
                 
+                # Other missing admin fields ride along in the same write
+                # instead of a separate per-user read + update later
+                admin_defaults = _missing_admin_fields(data, course_module_structure)
+                admin_defaults.pop('assignmentGrades', None)
+                
                 # Update document if changes were made
-                if updated:
+                if updated or admin_defaults:
                     doc_ref = client.collection(USERS_COLLECTION).document(uid)
-                    batch.update(doc_ref, {
-                        'assignmentGrades': updated_grades,
+                    update_data = {
+                        **admin_defaults,
                         'updatedAt': datetime.now(timezone.utc)
-                    })
+                    }
+                    if updated:
+                        update_data['assignmentGrades'] = updated_grades
+                    batch.update(doc_ref, update_data)
                     batch_count += 1
                     stats['updated'] += 1
                     
@@ -1200,6 +1338,7 @@ def sync_assignment_fields_to_lab_count(course_module_structure: Optional[Dict[s
             except Exception as batch_error:
                 logger.error(f"Error committing final batch: {batch_error}", exc_info=True)
                 stats['errors'] += batch_count
+        invalidate_users_cache()
         
         logger.info(
             f"Synced assignment fields: {stats['updated']} students updated "
@@ -22,7 +22,11 @@ The data structure matches the normalized format:
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+import copy
+import hashlib
+import json
+import threading
 import time
 
 import firebase_admin
@@ -35,6 +39,15 @@ from firestore.operations_cache import sanitize_for_firestore
 COURSE_DATA_COLLECTION = "course_data"
 COURSE_DATA_DOCUMENT_ID = "main"  # Single document stores all course data
 
+# Seconds a cached read is served before Firestore is asked again. Writes in
+# this process refresh the cache immediately; the TTL bounds how long other
+# processes can serve an older copy.
+COURSE_DATA_CACHE_TTL = 30
+
+# (fetched_at, data) of the last read or write; None when empty
+_course_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+_course_cache_lock = threading.Lock()
+
 
 def _get_firestore_client() -> Optional[firestore.Client]:
     """Return a Firestore client if Firebase Admin is initialized, else None."""
@@ -48,13 +61,48 @@ def _get_firestore_client() -> Optional[firestore.Client]:
         return None
 
 
-def get_course_data() -> Optional[Dict[str, Any]]:
+def content_version(data: Dict[str, Any]) -> int:
+    """
+    Return a stable numeric version derived from the course content.
+
+    Used for legacy documents stored without a version: the same content
+    always yields the same 13-digit value (timestamp-sized), so clients
+    don't see a spurious change on every read.
+    """
+    content = {key: value for key, value in data.items() if key != "version"}
+    data_str = json.dumps(content, sort_keys=True, default=str)
+    return int(hashlib.sha256(data_str.encode("utf-8")).hexdigest(), 16) % (10**13)
+
+
+def _set_course_cache(data: Optional[Dict[str, Any]]) -> None:
+    global _course_cache
+    with _course_cache_lock:
+        _course_cache = (time.monotonic(), data) if data is not None else None
+
+
+def invalidate_course_data_cache() -> None:
+    """Drop the cached course data so the next read goes to Firestore."""
+    _set_course_cache(None)
+
+
+def get_course_data(use_cache: bool = True) -> Optional[Dict[str, Any]]:
     """
     Read course data from Firestore.
     
+    Args:
+        use_cache: Serve a copy read within COURSE_DATA_CACHE_TTL seconds if
+            available. The cached dict is shared: callers must treat it as
+            read-only. Read-modify-write callers pass False to get a fresh,
+            private dict.
+    
     Returns:
         Course data dict with 'version' and 'courses' keys, or None if not found/error
     """
+    if use_cache:
+        cached = _course_cache
+        if cached is not None and time.monotonic() - cached[0] < COURSE_DATA_CACHE_TTL:
+            return cached[1]
+    
     client = _get_firestore_client()
     if not client:
         return None
@@ -72,9 +120,17 @@ def get_course_data() -> Optional[Dict[str, Any]]:
         # Ensure required structure exists
         if "courses" not in data:
             data["courses"] = []
-        if "version" not in data:
-            data["version"] = int(time.time() * 1000)
+        if not data.get("version"):
+            # Legacy document: derive the version from the content once and
+            # store it, so later reads (and /course/version) are a dict lookup
+            data["version"] = content_version(data)
+            try:
+                doc_ref.update({"version": data["version"]})
+            except Exception as exc:
+                logger.warning(f"Could not store version for legacy course data: {exc}")
         
+        # Cache a separate copy so callers mutating their result can't alter it
+        _set_course_cache(copy.deepcopy(data) if not use_cache else data)
         return data
     except Exception as exc:
         logger.error(f"Error reading course data from Firestore: {exc}", exc_info=True)
@@ -111,6 +167,7 @@ def update_course_data(data: Dict[str, Any]) -> bool:
         # Write to Firestore
         doc_ref = client.collection(COURSE_DATA_COLLECTION).document(COURSE_DATA_DOCUMENT_ID)
         doc_ref.set(sanitized_data, merge=False)  # Replace entire document
+        _set_course_cache(copy.deepcopy(sanitized_data))
         
         logger.info(f"Course data updated in Firestore (version: {data.get('version')})")
         return True
@@ -9,12 +9,18 @@ This module provides:
 
 from __future__ import annotations
 
+import gzip
+import json
 import math
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import firebase_admin
 from firebase_admin import firestore
+from google.api_core.retry import Retry, if_transient_error
+from google.cloud.firestore_v1.transforms import Sentinel
 
 from core.logger import logger
 
@@ -31,6 +37,39 @@ def _get_firestore_client() -> Optional[firestore.Client]:
         return None
 
 
+_CLEAN_TYPES = frozenset((type(None), bool, int, str))
+
+
+def _is_clean(obj: Any) -> bool:
+    """
+    Return True if `obj` would come out of sanitization unchanged.
+
+    Accepts plain scalars, finite floats and Firestore sentinels inside dicts
+    with string keys and lists; anything else needs the full pass.
+    """
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        t = type(item)
+        if t in _CLEAN_TYPES or isinstance(item, Sentinel):
+            continue
+        if t is float:
+            if math.isnan(item) or math.isinf(item):
+                return False
+            continue
+        if t is dict:
+            for k, v in item.items():
+                if type(k) is not str:
+                    return False
+                stack.append(v)
+            continue
+        if t is list:
+            stack.extend(item)
+            continue
+        return False
+    return True
+
+
 def sanitize_for_firestore(obj: Any) -> Any:
     """
     Recursively sanitize an object so it can be stored in Firestore.
@@ -38,20 +77,25 @@ def sanitize_for_firestore(obj: Any) -> Any:
     - datetime / pandas Timestamp -> ISO 8601 string
     - float('nan'), float('inf'), float('-inf') -> None
     - numpy scalars -> underlying Python scalars
+    - Firestore sentinels (SERVER_TIMESTAMP, DELETE_FIELD) -> passed through
     - Other types are returned unchanged if JSON-serializable.
+
+    Payloads that are already Firestore-native are returned as-is without
+    rebuilding them.
     """
-    # Lazy import to avoid hard dependency if pandas/numpy are not used
-    try:  # pragma: no cover - best-effort
-        import pandas as pd  # type: ignore
-        import numpy as np  # type: ignore
-    except Exception:  # pragma: no cover - defensive
-        pd = None  # type: ignore
-        np = None  # type: ignore
+    if _is_clean(obj):
+        return obj
+    return _sanitize(obj)
 
+
+def _sanitize(obj: Any) -> Any:
     # Simple types first
     if obj is None or isinstance(obj, (bool, int, str)):
         return obj
 
+    if isinstance(obj, Sentinel):
+        return obj
+
     # Floats / NaN / inf
     if isinstance(obj, float):
         if math.isnan(obj) or math.isinf(obj):
@@ -77,17 +121,17 @@ def sanitize_for_firestore(obj: Any) -> Any:
         try:
             # numpy scalar
             if hasattr(obj, "item"):
-                return sanitize_for_firestore(obj.item())
+                return _sanitize(obj.item())
         except Exception:  # pragma: no cover - defensive
             return None
 
     # dict
     if isinstance(obj, dict):
-        return {str(k): sanitize_for_firestore(v) for k, v in obj.items()}
+        return {str(k): _sanitize(v) for k, v in obj.items()}
 
     # list / tuple / set
     if isinstance(obj, (list, tuple, set)):
-        return [sanitize_for_firestore(v) for v in obj]
+        return [_sanitize(v) for v in obj]
 
     # Fallback: string representation
     return str(obj)
@@ -100,9 +144,54 @@ def sanitize_for_firestore(obj: Any) -> Any:
 SYNC_COLLECTION = "operations_sync"
 SYNC_STATUS_DOC = "status"
 
+# Short-lived memo of the status document so polling endpoints don't issue
+# one Firestore read per request. Cleared whenever this process mutates it.
+_STATUS_TTL = 2.0
+_STATUS_CACHE: Optional[Tuple[float, Dict[str, Any]]] = None
+
+
+# (client, refs) memo of the fixed DocumentReferences used on hot paths;
+# rebuilt if firebase_admin hands back a different client.
+_REFS: Optional[Tuple[Any, Dict[str, Any]]] = None
+
+
+def _refs(client) -> Dict[str, Any]:
+    """Return cached collection/document references for `client`."""
+    global _REFS
+    cached = _REFS
+    if cached is None or cached[0] is not client:
+        list_coll = client.collection(STUDENTS_LIST_COLLECTION)
+        cached = (client, {
+            "sync_status": client.collection(SYNC_COLLECTION).document(SYNC_STATUS_DOC),
+            "students_list": list_coll,
+            "students_main": list_coll.document(STUDENTS_LIST_MAIN_DOC),
+            "students_detail": client.collection(STUDENTS_DETAIL_COLLECTION),
+            "metrics_latest": client.collection(METRICS_COLLECTION).document(
+                METRICS_LATEST_DOC
+            ),
+        })
+        _REFS = cached
+    return cached[1]
+
+
+def _invalidate_status_cache() -> None:
+    global _STATUS_CACHE
+    _STATUS_CACHE = None
+
+
+def _timestamps_to_iso(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Render stored Timestamps (DatetimeWithNanoseconds) as ISO strings for the API."""
+    return {
+        k: v.isoformat() if isinstance(v, datetime) else v for k, v in data.items()
+    }
+
 
 def get_sync_status() -> Dict[str, Any]:
     """Return the current sync status document, or defaults if missing."""
+    cached = _STATUS_CACHE
+    if cached and time.monotonic() - cached[0] < _STATUS_TTL:
+        return dict(cached[1])
+
     client = _get_firestore_client()
     if not client:
         return {
@@ -112,19 +201,52 @@ def get_sync_status() -> Dict[str, Any]:
             "last_error": "Firestore client not available",
         }
 
-    doc_ref = client.collection(SYNC_COLLECTION).document(SYNC_STATUS_DOC)
-    snap = doc_ref.get()
+    data = _cache_status_snapshot(_refs(client)["sync_status"].get())
+    return dict(data)
+
+
+def _cache_status_snapshot(snap) -> Dict[str, Any]:
+    """Convert a sync status snapshot to the API shape and cache it."""
+    global _STATUS_CACHE
     if not snap.exists:
-        return {
+        data = {
             "status": "IDLE",
             "started_at": None,
             "finished_at": None,
             "last_error": None,
         }
-    data = snap.to_dict() or {}
+    else:
+        data = _timestamps_to_iso(snap.to_dict() or {})
+    _STATUS_CACHE = (time.monotonic(), data)
     return data
 
 
+def get_sync_status_and_metrics() -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Return (sync status, latest metrics) with a single batched read.
+
+    Equivalent to calling get_sync_status() and get_metrics_from_firestore(),
+    but both documents come back from one get_all round trip (or just the
+    metrics one, while the status is cached).
+    """
+    cached = _STATUS_CACHE
+    if cached and time.monotonic() - cached[0] < _STATUS_TTL:
+        return dict(cached[1]), get_metrics_from_firestore()
+
+    client = _get_firestore_client()
+    if not client:
+        return get_sync_status(), None
+
+    refs = _refs(client)
+    status_ref, metrics_ref = refs["sync_status"], refs["metrics_latest"]
+    snaps = {snap.reference.path: snap for snap in client.get_all([status_ref, metrics_ref])}
+
+    status = dict(_cache_status_snapshot(snaps[status_ref.path]))
+    metrics_snap = snaps[metrics_ref.path]
+    metrics = _timestamps_to_iso(metrics_snap.to_dict() or {}) if metrics_snap.exists else None
+    return status, metrics
+
+
 def set_sync_status(status: str, details: Optional[Dict[str, Any]] = None) -> None:
     """Set the sync status document to the given status and details."""
     client = _get_firestore_client()
@@ -138,7 +260,8 @@ def set_sync_status(status: str, details: Optional[Dict[str, Any]] = None) -> No
     # Sanitize before storing
     payload = sanitize_for_firestore(payload)
 
-    client.collection(SYNC_COLLECTION).document(SYNC_STATUS_DOC).set(payload, merge=True)
+    _refs(client)["sync_status"].set(payload, merge=True)
+    _invalidate_status_cache()
 
 
 def acquire_sync_lock(max_age_minutes: int = 15) -> bool:
@@ -153,7 +276,7 @@ def acquire_sync_lock(max_age_minutes: int = 15) -> bool:
         logger.warning("Firestore not available, proceeding without sync lock")
         return True
 
-    doc_ref = client.collection(SYNC_COLLECTION).document(SYNC_STATUS_DOC)
+    doc_ref = _refs(client)["sync_status"]
     now = datetime.now(timezone.utc)
 
     @firestore.transactional
@@ -161,19 +284,20 @@ def acquire_sync_lock(max_age_minutes: int = 15) -> bool:
         snap = ref.get(transaction=transaction)
         data = snap.to_dict() if snap.exists else {}
         status = data.get("status", "IDLE")
-        started_at_raw = data.get("started_at")
-
-        # Parse started_at if it's a string
-        started_at = None
-        if isinstance(started_at_raw, str):
+        # Stored as a native Timestamp (read back as DatetimeWithNanoseconds);
+        # documents written before that change still hold an ISO string.
+        started_at = data.get("started_at")
+        if isinstance(started_at, str):
             try:
-                started_at = datetime.fromisoformat(started_at_raw)
-            except Exception:
+                started_at = datetime.fromisoformat(started_at)
+            except ValueError:
                 started_at = None
 
         too_recent = False
-        if started_at and isinstance(started_at, datetime):
-            delta = now - started_at.replace(tzinfo=timezone.utc)
+        if isinstance(started_at, datetime):
+            if started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            delta = now - started_at
             too_recent = delta.total_seconds() < max_age_minutes * 60
 
         if status == "IN_PROGRESS" and too_recent:
@@ -181,7 +305,7 @@ def acquire_sync_lock(max_age_minutes: int = 15) -> bool:
 
         new_data = {
             "status": "IN_PROGRESS",
-            "started_at": now.isoformat(),
+            "started_at": firestore.SERVER_TIMESTAMP,
             "finished_at": None,
             "last_error": None,
         }
@@ -191,8 +315,10 @@ def acquire_sync_lock(max_age_minutes: int = 15) -> bool:
     try:
         transaction = client.transaction()
         acquired = _tx(transaction, doc_ref)
+        _invalidate_status_cache()
         return acquired
     except Exception as exc:  # pragma: no cover - defensive
+        _invalidate_status_cache()
         logger.error(f"Failed to acquire sync lock: {exc}", exc_info=True)
         # Fail closed to prevent concurrent syncs if Firestore is having issues
         # This prevents race conditions when the database is unstable
@@ -205,9 +331,8 @@ def release_sync_lock(success: bool, error: Optional[str] = None) -> None:
     if not client:
         return
 
-    now = datetime.now(timezone.utc).isoformat()
     data: Dict[str, Any] = {
-        "finished_at": now,
+        "finished_at": firestore.SERVER_TIMESTAMP,
     }
     if success:
         data["status"] = "IDLE"
@@ -216,9 +341,8 @@ def release_sync_lock(success: bool, error: Optional[str] = None) -> None:
         data["status"] = "ERROR"
         data["last_error"] = str(error) if error else "Unknown error"
 
-    client.collection(SYNC_COLLECTION).document(SYNC_STATUS_DOC).set(
-        sanitize_for_firestore(data), merge=True
-    )
+    _refs(client)["sync_status"].set(sanitize_for_firestore(data), merge=True)
+    _invalidate_status_cache()
 
 
 # ---------------------------------------------------------------------------
@@ -227,65 +351,159 @@ def release_sync_lock(success: bool, error: Optional[str] = None) -> None:
 
 STUDENTS_LIST_COLLECTION = "operations_students_list"
 STUDENTS_LIST_MAIN_DOC = "main"
+# v2: single document with gzip-compressed JSON bytes in `students_gz`
+# v3: `main` is an index document; students live in `main_0`, `main_1`, ...
+STUDENTS_LIST_SCHEMA_GZIP = "v2"
+STUDENTS_LIST_SCHEMA_SHARDED = "v3"
+STUDENTS_LIST_SHARD_SIZE = 500
 
 STUDENTS_DETAIL_COLLECTION = "operations_students_detail"
 
 METRICS_COLLECTION = "operations_metrics"
 METRICS_LATEST_DOC = "latest"
 
+# Stay below Firestore's 500 writes per batch
+_MAX_BATCH_WRITES = 400
+
+
+def _compress_students(students: List[Dict[str, Any]]) -> bytes:
+    """Serialize a students list to compact JSON and gzip it."""
+    return gzip.compress(json.dumps(students, separators=(",", ":")).encode("utf-8"))
+
+
+def _decompress_students(blob: bytes) -> Any:
+    """Inverse of `_compress_students`."""
+    return json.loads(gzip.decompress(blob))
+
+
+# Exponential backoff for batch commits; only transient errors
+# (UNAVAILABLE, INTERNAL, DEADLINE_EXCEEDED, ...) are retried.
+_COMMIT_RETRY = Retry(
+    initial=0.5,
+    maximum=8.0,
+    multiplier=2.0,
+    deadline=60.0,
+    predicate=if_transient_error,
+)
 
-def sync_students_to_firestore(students: List[Dict[str, Any]], metrics: Dict[str, Any]) -> bool:
+
+def _shard_doc_id(index: int) -> str:
+    return f"{STUDENTS_LIST_MAIN_DOC}_{index}"
+
+
+def _commit_writes(client, writes: List[Tuple[str, Any, Any]]) -> None:
+    """Apply ("set" | "delete", ref, payload) writes in retried batches."""
+    batch = client.batch()
+    count = 0
+    for op, ref, payload in writes:
+        if op == "set":
+            batch.set(ref, payload)
+        else:
+            batch.delete(ref)
+        count += 1
+        if count >= _MAX_BATCH_WRITES:
+            batch.commit(retry=_COMMIT_RETRY)
+            batch = client.batch()
+            count = 0
+    if count:
+        batch.commit(retry=_COMMIT_RETRY)
+
+
+def sync_students_to_firestore(
+    students: List[Dict[str, Any]], metrics: Dict[str, Any]
+) -> bool:
     """
     Write merged student data and metrics to Firestore.
 
-    - Students list: stored as a single document for efficient reads at small scale.
+    Returns True only if both were written; see
+    sync_students_to_firestore_detailed() for per-collection results.
+    """
+    return sync_students_to_firestore_detailed(students, metrics)["success"]
+
+
+def sync_students_to_firestore_detailed(
+    students: List[Dict[str, Any]], metrics: Dict[str, Any]
+) -> Dict[str, bool]:
+    """
+    Write merged student data and metrics to Firestore, reporting each part.
+
+    - Students list: split into fixed-size shards (`main_0`, `main_1`, ...), each
+      holding gzip-compressed JSON, plus a `main` index document with the shard
+      count. Keeps every document far below the 1 MiB limit and lets readers
+      fetch all shards in a single batched RPC.
     - Metrics: stored in a dedicated document with last_synced timestamp.
+
+    The two collections are committed independently (each with retries), so a
+    failure in one does not discard the other. Returns a dict with overall
+    `success` plus per-collection `students` / `metrics` flags, letting the
+    caller re-drive only the part that failed.
     """
+    result = {"success": False, "students": False, "metrics": False}
+
     client = _get_firestore_client()
     if not client:
         logger.warning("Skipping Firestore sync: client not available")
-        return False
+        return result
 
     try:
-        now = datetime.now(timezone.utc)
-
-        # Sanitize payloads
         students_payload = sanitize_for_firestore(students)
+
+        refs = _refs(client)
+        list_coll = refs["students_list"]
+        index_ref = refs["students_main"]
+
+        # Remember the previous shard count so stale shards can be removed
+        previous_shards = 0
+        index_snap = index_ref.get()
+        if index_snap.exists:
+            previous_shards = int((index_snap.to_dict() or {}).get("shard_count") or 0)
+
+        shards = [
+            students_payload[i : i + STUDENTS_LIST_SHARD_SIZE]
+            for i in range(0, len(students_payload), STUDENTS_LIST_SHARD_SIZE)
+        ]
+
+        writes = []
+        for i, shard in enumerate(shards):
+            writes.append(("set", list_coll.document(_shard_doc_id(i)), {
+                "students_gz": _compress_students(shard),
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            }))
+        for i in range(len(shards), previous_shards):
+            writes.append(("delete", list_coll.document(_shard_doc_id(i)), None))
+
+        # Index document is written last so readers never see a shard count
+        # pointing at shards that have not been written yet.
+        writes.append(("set", index_ref, {
+            "schema": STUDENTS_LIST_SCHEMA_SHARDED,
+            "shard_count": len(shards),
+            "total": len(students_payload),
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        }))
+
+        _commit_writes(client, writes)
+        result["students"] = True
+        logger.info(
+            f"Synced {len(students)} students ({len(shards)} shards) "
+            "to Firestore operations cache"
+        )
+    except Exception as exc:  # pragma: no cover - defensive
+        logger.error(f"Failed to sync students list to Firestore: {exc}", exc_info=True)
+
+    try:
         metrics_payload = sanitize_for_firestore(
             {
                 **(metrics or {}),
-                "last_synced": now.isoformat(),
+                "last_synced": firestore.SERVER_TIMESTAMP,
             }
         )
-
-        batch = client.batch()
-
-        # Students list (compressed view; we currently store full dicts)
-        list_doc_ref = client.collection(STUDENTS_LIST_COLLECTION).document(
-            STUDENTS_LIST_MAIN_DOC
-        )
-        batch.set(
-            list_doc_ref,
-            {
-                "students": students_payload,
-                "updated_at": now.isoformat(),
-            },
-        )
-
-        # Metrics
-        metrics_doc_ref = client.collection(METRICS_COLLECTION).document(
-            METRICS_LATEST_DOC
-        )
-        batch.set(metrics_doc_ref, metrics_payload)
-
-        batch.commit()
-        logger.info(
-            f"Synced {len(students)} students and metrics to Firestore operations cache"
-        )
-        return True
+        _refs(client)["metrics_latest"].set(metrics_payload, retry=_COMMIT_RETRY)
+        result["metrics"] = True
     except Exception as exc:  # pragma: no cover - defensive
-        logger.error(f"Failed to sync students to Firestore: {exc}", exc_info=True)
-        return False
+        logger.error(f"Failed to sync metrics to Firestore: {exc}", exc_info=True)
+
+    result["success"] = result["students"] and result["metrics"]
+    return result
 
 
 def get_students_list_from_firestore() -> Optional[List[Dict[str, Any]]]:
@@ -295,14 +513,33 @@ def get_students_list_from_firestore() -> Optional[List[Dict[str, Any]]]:
         return None
 
     try:
-        doc_ref = client.collection(STUDENTS_LIST_COLLECTION).document(
-            STUDENTS_LIST_MAIN_DOC
-        )
-        snap = doc_ref.get()
+        refs = _refs(client)
+        list_coll = refs["students_list"]
+        snap = refs["students_main"].get()
         if not snap.exists:
             return None
         data = snap.to_dict() or {}
-        students = data.get("students")
+        schema = data.get("schema")
+
+        if schema == STUDENTS_LIST_SCHEMA_SHARDED:
+            shard_count = int(data.get("shard_count") or 0)
+            refs = [list_coll.document(_shard_doc_id(i)) for i in range(shard_count)]
+            # get_all issues one BatchGetDocuments RPC; results arrive unordered
+            shard_snaps = {s.id: s for s in client.get_all(refs)} if refs else {}
+            students: Any = []
+            for i in range(shard_count):
+                shard_snap = shard_snaps.get(_shard_doc_id(i))
+                if shard_snap is None or not shard_snap.exists:
+                    logger.warning(f"Students list shard {i} missing from Firestore cache")
+                    return None
+                students.extend(
+                    _decompress_students((shard_snap.to_dict() or {})["students_gz"])
+                )
+        elif schema == STUDENTS_LIST_SCHEMA_GZIP and data.get("students_gz"):
+            students = _decompress_students(data["students_gz"])
+        else:
+            # Legacy documents store the list verbatim
+            students = data.get("students")
         if not isinstance(students, list):
             return None
         return students
@@ -322,8 +559,7 @@ def get_student_detail_from_firestore(email: str) -> Optional[Dict[str, Any]]:
         return None
 
     try:
-        doc_ref = client.collection(STUDENTS_DETAIL_COLLECTION).document(norm_email)
-        snap = doc_ref.get()
+        snap = _refs(client)["students_detail"].document(norm_email).get()
         if not snap.exists:
             return None
         return snap.to_dict() or {}
@@ -339,11 +575,10 @@ def get_metrics_from_firestore() -> Optional[Dict[str, Any]]:
         return None
 
     try:
-        doc_ref = client.collection(METRICS_COLLECTION).document(METRICS_LATEST_DOC)
-        snap = doc_ref.get()
+        snap = _refs(client)["metrics_latest"].get()
         if not snap.exists:
             return None
-        return snap.to_dict() or {}
+        return _timestamps_to_iso(snap.to_dict() or {})
     except Exception as exc:  # pragma: no cover - defensive
         logger.error(f"Error reading metrics from Firestore: {exc}", exc_info=True)
         return None
@@ -365,19 +600,22 @@ def clear_firestore_cache() -> bool:
             for doc in docs:
                 batch.delete(doc.reference)
                 count += 1
-                if count >= 400:  # safety batch size
+                if count >= _MAX_BATCH_WRITES:
                     batch.commit()
                     batch = client.batch()
                     count = 0
             if count:
                 batch.commit()
 
-        for coll in [
+        # Collections are independent and the client is thread-safe, so clear
+        # them concurrently; list() re-raises the first failure.
+        collections = [
             STUDENTS_LIST_COLLECTION,
             STUDENTS_DETAIL_COLLECTION,
             METRICS_COLLECTION,
-        ]:
-            _clear_collection(coll)
+        ]
+        with ThreadPoolExecutor(max_workers=len(collections)) as executor:
+            list(executor.map(_clear_collection, collections))
 
         logger.info("Cleared Firestore operations cache collections")
         return True
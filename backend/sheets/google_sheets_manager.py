@@ -8,11 +8,15 @@ import json
 import pandas as pd
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Any, Optional, Tuple, Union
 
+import cachetools
 from google.oauth2 import service_account
 import gspread
 import gspread.exceptions
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from requests.adapters import HTTPAdapter
 
 from core.logger import logger
 from firestore.admin_data import (
@@ -22,9 +26,13 @@ from firestore.admin_data import (
     get_all_users_admin_data,
     update_user_admin_data_by_email,
     bulk_update_users_admin_data,
+    set_class_attendance,
     sync_payment_backups_to_firestore,
 )
+from sheets.sheets_rate_limit import TokenBucket
 from sheets.sheets_utils import (
+    EMAIL_KEY_COLUMN,
+    add_email_key,
     format_attendance,
     format_attendance_to_string,
     normalize_dataframe,
@@ -56,20 +64,36 @@ class GoogleSheetsManager:
         self.client = self._initialize_client()
         
         # Simple cache to reduce API calls (helps with rate limits)
-        self._cache = {}
         self._cache_ttl = 300  # Cache for 5 minutes (300 seconds) to reduce API calls and avoid rate limits
+        # After the TTL, entries with a refresher are served stale for this long
+        # while a background refresh runs (stale-while-revalidate)
+        self._cache_stale_ttl = 300
+        # Entries are (data, timestamp, fresh_until, stale_until). The TTLCache
+        # bounds memory and evicts entries once past the stale window; it is
+        # not thread-safe, so every access goes through _cache_lock.
+        self._cache = cachetools.TTLCache(
+            maxsize=64, ttl=self._cache_ttl + self._cache_stale_ttl, timer=time.time
+        )
+        self._cache_lock = threading.RLock()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='sheets-refresh')
+        # Long-lived pool for fanning out the Register/Survey reads, so each
+        # request doesn't pay for spawning and joining fresh threads
+        self._read_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='sheets-read')
+        self._refreshing: set = set()
+        # Drive modifiedTime of the sheet each cached DataFrame was read from
+        self._sheet_modified: Dict[str, str] = {}
+        # Per students-list email indexes: cache_key -> (students list, index)
+        self._email_indexes: Dict[str, Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]] = {}
         
-        # Rate limiting: track last request time to throttle requests
-        self._last_request_time = 0
-        self._min_request_interval = 0.2  # Minimum 200ms between requests (5 requests/second max) - more conservative
+        # Rate limiting: token bucket matching the Sheets default read quota
+        # (60 requests/minute per user); bursts proceed without waiting
+        self._bucket = TokenBucket(capacity=60, refill_per_sec=1.0)
         
-        # Cache for course data (to get lab count)
-        self._course_data_cache = None
-        self._course_data_cache_time = 0
-        
-        # Lock to prevent concurrent reads of the same data (prevents race conditions)
-        self._read_lock = threading.Lock()
-        self._reading_students = False  # Flag to prevent concurrent get_all_students calls
+        # Single-flight loads: one in-progress Event per cache key so concurrent
+        # misses share a single fetch instead of all hitting the Sheets API
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        self._inflight_timeout = 30
         
         # Lock for attendance marking per class_id to prevent duplicate concurrent requests
         self._attendance_locks = {}  # Dict[class_id, threading.Lock]
@@ -134,6 +158,7 @@ class GoogleSheetsManager:
             
             # Initialize gspread client
             client = gspread.authorize(credentials)
+            self._configure_session_pool(client)
             logger.info("Google Sheets client initialized successfully")
             return client
             
@@ -141,6 +166,24 @@ class GoogleSheetsManager:
             logger.error(f"Error initializing Google Sheets client: {str(e)}", exc_info=True)
             raise
     
+    @staticmethod
+    def _configure_session_pool(client: gspread.Client) -> None:
+        """
+        Mount a keep-alive connection pool on the client's HTTP session so
+        consecutive Sheets calls reuse TLS connections instead of reconnecting.
+        """
+        # gspread 5.x exposes the AuthorizedSession as client.session,
+        # 6.x moved it to client.http_client.session
+        session = getattr(client, 'session', None)
+        if session is None:
+            session = getattr(getattr(client, 'http_client', None), 'session', None)
+        if session is None:
+            logger.debug("gspread session not found; using default connection handling")
+            return
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0)
+        session.mount('https://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+
     def _get_worksheet(self, spreadsheet_id: str, worksheet_name: str) -> gspread.Worksheet:
         """Get worksheet by name, checking object cache first."""
         cache_key = f"{spreadsheet_id}_{worksheet_name}"
@@ -196,49 +239,130 @@ class GoogleSheetsManager:
             logger.error(f"Error accessing worksheet: {str(e)}", exc_info=True)
             raise
     
-    def _get_cached_data(self, cache_key: str) -> tuple[Any, float]:
-        """Get cached data if still valid. Returns (data, timestamp) or (None, 0) if not cached."""
-        if cache_key in self._cache:
-            data, timestamp = self._cache[cache_key]
-            if time.time() - timestamp < self._cache_ttl:
-                return data, timestamp
-            else:
-                del self._cache[cache_key]
+    def _get_cached_data(self, cache_key: str, refresh=None) -> tuple[Any, float]:
+        """
+        Get cached data if still valid. Returns (data, timestamp) or (None, 0) if not cached.
+
+        If the entry is past its TTL but within the stale window and a refresh
+        callable is given, the stale data is returned and refresh() is run in
+        the background to repopulate the cache.
+        """
+        with self._cache_lock:
+            entry = self._cache.get(cache_key)
+        if entry is None:
+            return None, 0
+        data, timestamp, fresh_until, stale_until = entry
+        now = time.time()
+        if now < fresh_until:
+            return data, timestamp
+        if refresh is not None and now < stale_until:
+            self._schedule_refresh(cache_key, refresh)
+            return data, timestamp
+        # Expired entries are kept until stale_until so they can be revalidated
         return None, 0
     
+    def _expire_cached(self, cache_key: str) -> None:
+        """Mark an entry as expired but keep it available for revalidation."""
+        with self._cache_lock:
+            entry = self._cache.get(cache_key)
+            if entry is not None:
+                data, timestamp, _, stale_until = entry
+                self._cache[cache_key] = (data, timestamp, 0, stale_until)
+    
+    def _invalidate_cached(self, *cache_keys: str) -> None:
+        """Drop cache entries entirely (no stale serving or revalidation)."""
+        with self._cache_lock:
+            for cache_key in cache_keys:
+                self._cache.pop(cache_key, None)
+    
+    def _get_sheet_modified_time(self, spreadsheet_id: str) -> Optional[str]:
+        """Return the spreadsheet's Drive modifiedTime, or None if unavailable."""
+        # gspread 6.x moved request() from the client to client.http_client
+        requester = getattr(self.client, 'http_client', self.client)
+        try:
+            self._throttle_request()
+            response = requester.request(
+                'get',
+                f"{DRIVE_FILES_API_V3_URL}/{spreadsheet_id}",
+                params={'fields': 'modifiedTime', 'supportsAllDrives': True},
+            )
+            return response.json().get('modifiedTime')
+        except Exception as e:
+            logger.debug(f"Could not read modifiedTime for {spreadsheet_id}: {str(e)}")
+            return None
+    
+    def _revalidate_cached(self, cache_key: str, spreadsheet_id: str) -> Tuple[Any, Optional[str]]:
+        """
+        Revalidate an expired sheet cache entry against Drive's modifiedTime.
+        
+        Returns (data, modified_time). data is the cached value (with its TTL
+        extended) if the sheet hasn't changed since it was read, else None.
+        """
+        with self._cache_lock:
+            entry = self._cache.get(cache_key)
+        known = self._sheet_modified.get(cache_key)
+        if entry is None or known is None:
+            return None, None
+        modified = self._get_sheet_modified_time(spreadsheet_id)
+        if modified is not None and modified == known:
+            self._set_cached_data(cache_key, entry[0])
+            return entry[0], modified
+        return None, modified
+    
     def _set_cached_data(self, cache_key: str, data: Any):
-        """Cache data with timestamp. Can cache DataFrames or lists."""
-        self._cache[cache_key] = (data, time.time())
+        """Cache data with timestamp. Can cache DataFrames or lists (including empty ones)."""
+        now = time.time()
+        fresh_until = now + self._cache_ttl
+        with self._cache_lock:
+            self._cache[cache_key] = (data, now, fresh_until, fresh_until + self._cache_stale_ttl)
+    
+    def _set_sheet_data(self, cache_key: str, revision: Optional[str], data: Any):
+        """Cache a sheet read, then record the Drive revision it was read at."""
+        self._set_cached_data(cache_key, data)
+        if revision:
+            self._sheet_modified[cache_key] = revision
+    
+    def _schedule_refresh(self, cache_key: str, refresh) -> None:
+        """Run refresh() on the background executor unless one is already running for cache_key."""
+        with self._inflight_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+        
+        def _run():
+            try:
+                refresh()
+                logger.debug("Background refresh completed for %s", cache_key)
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {cache_key}: {str(e)}")
+            finally:
+                with self._inflight_lock:
+                    self._refreshing.discard(cache_key)
+        
+        self._refresh_executor.submit(_run)
     
     def _get_total_labs_count(self) -> int:
-        """Get total number of labs across all modules from course data."""
+        """
+        Get total number of labs across all modules from course data.
+
+        Served from the process-wide memo in student_helpers, which is
+        invalidated on course edits.
+        """
         try:
-            # Check cache first
-            if self._course_data_cache and (time.time() - self._course_data_cache_time) < 300:  # Cache for 5 minutes
-                return self._course_data_cache
-            
-            # Use helper function that reads from Firestore
             from students.student_helpers import get_total_labs_count
-            total_labs = get_total_labs_count()
-            
-            # Cache the result
-            self._course_data_cache = total_labs
-            self._course_data_cache_time = time.time()
-            
-            logger.info(f"Total labs across all modules: {total_labs}")
-            return total_labs
+            return get_total_labs_count()
         except Exception as e:
             logger.warning(f"Error getting total labs count: {str(e)}")
             return 2  # Default to 2 assignments
     
     def _throttle_request(self):
-        """Throttle requests to avoid hitting rate limits."""
-        current_time = time.time()
-        time_since_last = current_time - self._last_request_time
-        if time_since_last < self._min_request_interval:
-            sleep_time = self._min_request_interval - time_since_last
-            time.sleep(sleep_time)
-        self._last_request_time = time.time()
+        """
+        Throttle requests to avoid hitting rate limits.
+
+        Call only immediately before a real Sheets API request; blocks only
+        when the token bucket is empty.
+        """
+        self._bucket.acquire()
     
     def _retry_with_backoff(self, func, max_retries=3, initial_delay=5):
         """
@@ -275,6 +399,24 @@ class GoogleSheetsManager:
                     # Not a rate limit error, or max retries reached
                     raise
     
+    def _read_worksheet_frame(self, worksheet: gspread.Worksheet) -> pd.DataFrame:
+        """
+        Read a worksheet into a DataFrame using the first row as headers.
+
+        One values read; pandas builds the columns directly from the row lists
+        instead of going through per-row dicts. Cell values are kept as the
+        sheet displays them (formatted), so timestamps stay readable strings.
+        """
+        self._throttle_request()
+        values = worksheet.get_all_values()
+        if len(values) < 2 or not values[0]:
+            return pd.DataFrame()
+        df = pd.DataFrame(values[1:], columns=values[0])
+        # Drop blank header cells and keep the last of any repeated header,
+        # as per-row dicts did; duplicate labels break column-wise access
+        keep = ~df.columns.duplicated(keep='last') & (df.columns.str.strip() != '')
+        return df if keep.all() else df.loc[:, keep]
+
     def read_survey_data(self) -> pd.DataFrame:
         """
         Read data from Survey spreadsheet (READ-ONLY).
@@ -286,28 +428,40 @@ class GoogleSheetsManager:
             logger.debug("Using cached Survey data")
             return cached_data
         
+        # Expired: a metadata call is enough if the sheet hasn't been edited
+        cached_data, modified_time = self._revalidate_cached(cache_key, self.survey_spreadsheet_id)
+        if cached_data is not None:
+            logger.debug("Survey sheet unchanged; reusing cached data")
+            return cached_data
+        
         def _fetch_survey():
-            self._throttle_request()
+            # Take the revision before reading so edits made during the read
+            # are picked up by the next revalidation; it is only stored once
+            # the new data is cached, so a failed read can't vouch for old data
+            revision = modified_time or self._get_sheet_modified_time(self.survey_spreadsheet_id)
+            self._sheet_modified.pop(cache_key, None)
             worksheet = self._get_worksheet(self.survey_spreadsheet_id, self.survey_worksheet)
             
             try:
-                records = worksheet.get_all_records()
+                df = self._read_worksheet_frame(worksheet)
             except (gspread.exceptions.APIError, IndexError) as e:
                 # Handle completely empty worksheet (no headers) or API errors
                 if isinstance(e, IndexError) or 'Unable to parse range' in str(e) or 'No data found' in str(e):
                     logger.warning("Survey spreadsheet appears to be empty or has no data")
+                    # Cache the empty result too so empty sheets don't re-hit the API
+                    self._set_sheet_data(cache_key, revision, pd.DataFrame())
                     return pd.DataFrame()
                 # Re-raise to be handled by retry logic
                 raise
             
-            if not records:
+            if df.empty:
                 logger.warning("Survey spreadsheet is empty")
+                self._set_sheet_data(cache_key, revision, pd.DataFrame())
                 return pd.DataFrame()
             
-            df = pd.DataFrame(records)
-            df = normalize_dataframe(df)
+            df = add_email_key(normalize_dataframe(df))
             logger.info(f"Read {len(df)} records from Survey spreadsheet")
-            self._set_cached_data(cache_key, df)
+            self._set_sheet_data(cache_key, revision, df)
             return df
         
         try:
@@ -334,28 +488,40 @@ class GoogleSheetsManager:
             logger.debug("Using cached Register data")
             return cached_data
         
+        # Expired: a metadata call is enough if the sheet hasn't been edited
+        cached_data, modified_time = self._revalidate_cached(cache_key, self.register_spreadsheet_id)
+        if cached_data is not None:
+            logger.debug("Register sheet unchanged; reusing cached data")
+            return cached_data
+        
         def _fetch_register():
-            self._throttle_request()
+            # Take the revision before reading so edits made during the read
+            # are picked up by the next revalidation; it is only stored once
+            # the new data is cached, so a failed read can't vouch for old data
+            revision = modified_time or self._get_sheet_modified_time(self.register_spreadsheet_id)
+            self._sheet_modified.pop(cache_key, None)
             worksheet = self._get_worksheet(self.register_spreadsheet_id, self.register_worksheet)
             
             try:
-                records = worksheet.get_all_records()
+                df = self._read_worksheet_frame(worksheet)
             except (gspread.exceptions.APIError, IndexError) as e:
                 # Handle completely empty worksheet (no headers) or API errors
                 if isinstance(e, IndexError) or 'Unable to parse range' in str(e) or 'No data found' in str(e):
                     logger.warning("Register spreadsheet appears to be empty or has no data")
+                    # Cache the empty result too so empty sheets don't re-hit the API
+                    self._set_sheet_data(cache_key, revision, pd.DataFrame())
                     return pd.DataFrame()
                 # Re-raise to be handled by retry logic
                 raise
             
-            if not records:
+            if df.empty:
                 logger.warning("Register spreadsheet is empty")
+                self._set_sheet_data(cache_key, revision, pd.DataFrame())
                 return pd.DataFrame()
             
-            df = pd.DataFrame(records)
-            df = normalize_dataframe(df)
+            df = add_email_key(normalize_dataframe(df))
             logger.info(f"Read {len(df)} records from Register spreadsheet")
-            self._set_cached_data(cache_key, df)
+            self._set_sheet_data(cache_key, revision, df)
             return df
         
         try:
@@ -390,6 +556,10 @@ class GoogleSheetsManager:
                 logger.debug("No users found in Firestore")
                 return pd.DataFrame()
             
+            # Course structure is only needed for new-format grades; fetch it
+            # at most once per call rather than once per such user
+            course_module_structure = None
+            
             # Convert to list of dicts for DataFrame conversion
             rows = []
             for user_data in users:
@@ -407,7 +577,6 @@ class GoogleSheetsManager:
                 # Attendance (convert dict to JSON string)
                 attendance = user_data.get('attendance', {})
                 if isinstance(attendance, dict):
-                    import json
                     row['Attendance'] = json.dumps(attendance)
                 else:
                     row['Attendance'] = str(attendance) if attendance else '{}'
@@ -429,10 +598,11 @@ class GoogleSheetsManager:
                     if is_new_format:
                         # New format: flatten per-course/module structure
                         assignment_num = 1
-                        from firestore.course_data import get_course_data as get_course_data_from_firestore
-                        from students.student_helpers import get_course_module_structure
-                        course_data = get_course_data_from_firestore()
-                        course_module_structure = get_course_module_structure(course_data)
+                        if course_module_structure is None:
+                            from firestore.course_data import get_course_data as get_course_data_from_firestore
+                            from students.student_helpers import get_course_module_structure
+                            course_data = get_course_data_from_firestore()
+                            course_module_structure = get_course_module_structure(course_data)
                         
                         # Iterate through courses/modules in order
                         for course_id, modules in course_module_structure.items():
@@ -497,6 +667,42 @@ class GoogleSheetsManager:
             # Return empty DataFrame on error
             return pd.DataFrame()
     
+    def _load_single_flight(self, cache_key: str, loader, refresh=None) -> Any:
+        """
+        Return cached data for cache_key, or run loader() to produce it.
+
+        Cache hits take no lock. On a miss exactly one caller runs the loader
+        while concurrent callers for the same key wait on its Event and then
+        read the freshly cached result. Stale hits are served immediately and
+        refreshed in the background via refresh (defaults to loader).
+        """
+        cached_data, cache_time = self._get_cached_data(cache_key, refresh=refresh or loader)
+        if cached_data is not None:
+            logger.debug("Returning cached %s (age: %.1fs)", cache_key, time.time() - cache_time)
+            return cached_data
+
+        with self._inflight_lock:
+            event = self._inflight.get(cache_key)
+            is_leader = event is None
+            if is_leader:
+                event = threading.Event()
+                self._inflight[cache_key] = event
+
+        if is_leader:
+            try:
+                return loader()
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(cache_key, None)
+                event.set()
+
+        event.wait(timeout=self._inflight_timeout)
+        cached_data, _ = self._get_cached_data(cache_key)
+        if cached_data is not None:
+            return cached_data
+        # Leader failed, produced nothing cacheable, or timed out: load ourselves
+        return loader()
+
     def get_register_students(
         self,
         force_refresh: bool = False,
@@ -510,24 +716,30 @@ class GoogleSheetsManager:
         cache_key = f"register_students_{self.register_spreadsheet_id}"
         
         if force_refresh:
-            with self._read_lock:
-                if cache_key in self._cache:
-                    del self._cache[cache_key]
-                if f"register_{self.register_spreadsheet_id}" in self._cache:
-                    del self._cache[f"register_{self.register_spreadsheet_id}"]
-        
-        with self._read_lock:
-            cached_data, cache_time = self._get_cached_data(cache_key)
-            if cached_data is not None and not force_refresh:
-                logger.debug(f"Returning cached Register data (age: {time.time() - cache_time:.1f}s)")
-                return cached_data
+            self._invalidate_cached(cache_key, f"register_{self.register_spreadsheet_id}")
         
+        data_key = f"register_{self.register_spreadsheet_id}"
+        
+        def _refresh():
+            # The sheet cache expires at the same time as this one; force it
+            # to revalidate (cheap if the sheet is unchanged) rather than
+            # rebuilding from its stale copy
+            self._expire_cached(data_key)
+            return self._load_register_students(cache_key)
+        
+        return self._load_single_flight(
+            cache_key, lambda: self._load_register_students(cache_key), refresh=_refresh
+        )
+    
+    def _load_register_students(self, cache_key: str) -> List[Dict[str, Any]]:
+        """Read the Register sheet, convert rows for display and cache the result."""
         try:
             # Read Register spreadsheet
             register_df = self.read_register_data()
             
             if register_df.empty:
                 logger.debug("Register spreadsheet is empty")
+                self._set_cached_data(cache_key, [])
                 return []
             
             # Sort by Name (if available) or Email Address
@@ -536,15 +748,10 @@ class GoogleSheetsManager:
             elif 'Email Address' in register_df.columns:
                 register_df = register_df.sort_values('Email Address', na_position='last')
             
-            # Convert to list of dictionaries
-            students = []
-            for _, row in register_df.iterrows():
-                student_dict = prepare_student_for_display(row)
-                students.append(student_dict)
+            students = self._students_for_display(cache_key, register_df)
             
             # Cache the result
-            with self._read_lock:
-                self._set_cached_data(cache_key, students)
+            self._set_cached_data(cache_key, students)
             
             logger.info(f"Successfully loaded {len(students)} Register form entries")
             return students
@@ -566,24 +773,30 @@ class GoogleSheetsManager:
         cache_key = f"survey_students_{self.survey_spreadsheet_id}"
         
         if force_refresh:
-            with self._read_lock:
-                if cache_key in self._cache:
-                    del self._cache[cache_key]
-                if f"survey_{self.survey_spreadsheet_id}" in self._cache:
-                    del self._cache[f"survey_{self.survey_spreadsheet_id}"]
-        
-        with self._read_lock:
-            cached_data, cache_time = self._get_cached_data(cache_key)
-            if cached_data is not None and not force_refresh:
-                logger.debug(f"Returning cached Survey data (age: {time.time() - cache_time:.1f}s)")
-                return cached_data
+            self._invalidate_cached(cache_key, f"survey_{self.survey_spreadsheet_id}")
+        
+        data_key = f"survey_{self.survey_spreadsheet_id}"
         
+        def _refresh():
+            # The sheet cache expires at the same time as this one; force it
+            # to revalidate (cheap if the sheet is unchanged) rather than
+            # rebuilding from its stale copy
+            self._expire_cached(data_key)
+            return self._load_survey_students(cache_key)
+        
+        return self._load_single_flight(
+            cache_key, lambda: self._load_survey_students(cache_key), refresh=_refresh
+        )
+    
+    def _load_survey_students(self, cache_key: str) -> List[Dict[str, Any]]:
+        """Read the Survey sheet, convert rows for display and cache the result."""
         try:
             # Read Survey spreadsheet
             survey_df = self.read_survey_data()
             
             if survey_df.empty:
                 logger.debug("Survey spreadsheet is empty")
+                self._set_cached_data(cache_key, [])
                 return []
             
             # Sort by Name (if available) or Email Address
@@ -592,15 +805,10 @@ class GoogleSheetsManager:
             elif 'Email Address' in survey_df.columns:
                 survey_df = survey_df.sort_values('Email Address', na_position='last')
             
-            # Convert to list of dictionaries
-            students = []
-            for _, row in survey_df.iterrows():
-                student_dict = prepare_student_for_display(row)
-                students.append(student_dict)
+            students = self._students_for_display(cache_key, survey_df)
             
             # Cache the result
-            with self._read_lock:
-                self._set_cached_data(cache_key, students)
+            self._set_cached_data(cache_key, students)
             
             logger.info(f"Successfully loaded {len(students)} Survey form entries")
             return students
@@ -609,6 +817,90 @@ class GoogleSheetsManager:
             logger.error(f"Error getting Survey students: {str(e)}", exc_info=True)
             raise
     
+    def _batch_read_all(
+        self,
+        force_refresh: bool = False,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Load Register and Survey students concurrently.
+
+        The two spreadsheets are independent, so issuing the reads in parallel
+        bounds latency by the slower sheet instead of the sum of both.
+        """
+        loaders = {
+            'register': self.get_register_students,
+            'survey': self.get_survey_students,
+        }
+        futures = {
+            self._read_pool.submit(loader, force_refresh=force_refresh): name
+            for name, loader in loaders.items()
+        }
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+        return results
+
+    def get_all_form_students(
+        self,
+        force_refresh: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Get Register and Survey form data in one call.
+        
+        Returns:
+            Tuple of (register_students, survey_students)
+        """
+        results = self._batch_read_all(force_refresh=force_refresh)
+        return results['register'], results['survey']
+    
+    def _students_for_display(self, cache_key: str, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Convert sheet rows to display dicts and index them by email.
+
+        Rows are plain dicts (no per-row Series). The email index is built
+        from the precomputed EMAIL_KEY_COLUMN, which is dropped from the
+        output, so lookups need no per-row string normalization.
+        """
+        students: List[Dict[str, Any]] = []
+        index: Dict[str, Dict[str, Any]] = {}
+        for row in df.to_dict(orient='records'):
+            email_key = row.pop(EMAIL_KEY_COLUMN, None)
+            student = prepare_student_for_display(row)
+            students.append(student)
+            if isinstance(email_key, str) and email_key:
+                # Keep the first match, as the previous linear scan did
+                index.setdefault(email_key, student)
+        if EMAIL_KEY_COLUMN in df.columns:
+            self._email_indexes[cache_key] = (students, index)
+        return students
+    
+    @staticmethod
+    def _student_email_key(student: Dict[str, Any]) -> Optional[str]:
+        """Return the normalized email of a display student dict, if any."""
+        for key in ('Email Address', 'Email', 'email', 'email_address'):
+            if key in student and student[key]:
+                return str(student[key]).lower().strip()
+        return None
+    
+    def _get_email_index(self, cache_key: str, students: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Return a normalized-email -> student index for a cached students list.
+        
+        The index is rebuilt only when the cached list object changes (reload,
+        refresh or invalidation), so repeated lookups are O(1).
+        """
+        entry = self._email_indexes.get(cache_key)
+        if entry is not None and entry[0] is students:
+            return entry[1]
+        index: Dict[str, Dict[str, Any]] = {}
+        for student in students:
+            email = self._student_email_key(student)
+            if email:
+                # Keep the first match, as the previous linear scan did
+                index.setdefault(email, student)
+        self._email_indexes[cache_key] = (students, index)
+        return index
+    
     def get_student_by_email(self, email: str, source: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Get specific student data by email address from Register or Survey.
@@ -623,41 +915,21 @@ class GoogleSheetsManager:
         try:
             email_lower = email.lower().strip()
             
-            if source == 'register':
-                students = self.get_register_students()
-            elif source == 'survey':
-                students = self.get_survey_students()
-            else:
-                # Search both if source not specified
-                register_students = self.get_register_students()
-                for student in register_students:
-                    student_email = None
-                    for key in ['Email Address', 'Email', 'email', 'email_address']:
-                        if key in student and student[key]:
-                            student_email = str(student[key]).lower().strip()
-                            break
-                    if student_email == email_lower:
-                        return student
-                
-                survey_students = self.get_survey_students()
-                for student in survey_students:
-                    student_email = None
-                    for key in ['Email Address', 'Email', 'email', 'email_address']:
-                        if key in student and student[key]:
-                            student_email = str(student[key]).lower().strip()
-                            break
-                    if student_email == email_lower:
-                        return student
-                return None
-            
-            for student in students:
-                student_email = None
-                for key in ['Email Address', 'Email', 'email', 'email_address']:
-                    if key in student and student[key]:
-                        student_email = str(student[key]).lower().strip()
-                        break
-                
-                if student_email == email_lower:
+            sources = []
+            if source in (None, 'register'):
+                sources.append((
+                    f"register_students_{self.register_spreadsheet_id}",
+                    self.get_register_students,
+                ))
+            if source in (None, 'survey'):
+                sources.append((
+                    f"survey_students_{self.survey_spreadsheet_id}",
+                    self.get_survey_students,
+                ))
+            
+            for cache_key, loader in sources:
+                student = self._get_email_index(cache_key, loader()).get(email_lower)
+                if student is not None:
                     return student
             
             return None
@@ -689,8 +961,7 @@ class GoogleSheetsManager:
                 )
             
             # Clear cache
-            if 'all_students' in self._cache:
-                del self._cache['all_students']
+            self._invalidate_cached('all_students')
             
             return success
             
@@ -717,9 +988,16 @@ class GoogleSheetsManager:
                 return worksheet
             except gspread.exceptions.WorksheetNotFound:
                 logger.info(f"Creating new worksheet '{worksheet_name}' in spreadsheet {spreadsheet_id}")
-                # Create with headers row
+                # Create with headers row; anchoring the append at A1 skips
+                # the table-extent lookup of a plain append_row
                 ws = spreadsheet.add_worksheet(title=worksheet_name, rows=100, cols=10)
-                ws.append_row(['id', 'date', 'topic', 'description'])
+                self._throttle_request()
+                ws.append_rows(
+                    [['id', 'date', 'topic', 'description']],
+                    value_input_option='RAW',
+                    table_range='A1',
+                    include_values_in_response=False,
+                )
                 self._worksheets_cache[cache_key] = ws
                 return ws
         except Exception as e:
@@ -800,8 +1078,8 @@ class GoogleSheetsManager:
             # Normalize present_emails for comparison
             present_emails_set = {email.lower().strip() for email in present_emails if email}
             
-            # 1. Fetch all Firebase users with admin data
-            users = get_all_users_admin_data()
+            # 1. Fetch all Firebase users (only the fields compared below)
+            users = get_all_users_admin_data(fields=['email', 'attendance'])
             
             logger.info(f"Found {len(users)} total users to check")
             
@@ -816,7 +1094,7 @@ class GoogleSheetsManager:
                 }
             
             # 2. Build updates with idempotency check - only update if attendance actually changed
-            updates = []
+            updates: Dict[str, bool] = {}
             skipped_count = 0
             
             for user in users:
@@ -841,13 +1119,7 @@ class GoogleSheetsManager:
                     skipped_count += 1
                     continue
                 
-                # Update status for this class
-                attendance[class_id] = desired_status
-                
-                updates.append({
-                    'email': email,
-                    'Attendance': attendance
-                })
+                updates[user['_id']] = desired_status
             
             # 3. If no updates needed, return early (but still clear cache to ensure fresh data)
             if not updates:
@@ -857,8 +1129,7 @@ class GoogleSheetsManager:
                 )
                 
                 # Still clear cache to ensure we have the latest data (in case it was stale)
-                if 'all_students' in self._cache:
-                    del self._cache['all_students']
+                self._invalidate_cached('all_students')
                 
                 return {
                     'success': True,
@@ -873,18 +1144,11 @@ class GoogleSheetsManager:
                 f"({skipped_count} already correct, skipped)"
             )
             
-            # 4. Bulk update via Firestore
-            result = self.bulk_update_admin_logs(updates)
-            
-            # Handle both boolean and dict return types
-            if isinstance(result, dict):
-                success = result.get('success', False)
-                updated_count = result.get('updated', 0)
-                failed_count = result.get('failed', 0)
-            else:
-                success = result
-                updated_count = len(updates) if success else 0
-                failed_count = 0 if success else len(updates)
+            # 4. One attendance.<class_id> write per changed student, batched
+            result = set_class_attendance(class_id, updates)
+            success = result['success']
+            updated_count = result['updated']
+            failed_count = result['failed']
             
             if success:
                 logger.info(
@@ -893,8 +1157,7 @@ class GoogleSheetsManager:
                 )
                 
                 # Invalidate caches to ensure fresh data on next read
-                if 'all_students' in self._cache:
-                    del self._cache['all_students']
+                self._invalidate_cached('all_students')
                 
                 # Also clear Firestore operations cache
                 try:
@@ -934,8 +1197,8 @@ class GoogleSheetsManager:
         Invalidate course data cache (lab count cache).
         Call this when modules are added/updated/deleted.
         """
-        self._course_data_cache = None
-        self._course_data_cache_time = 0
+        from students.student_helpers import invalidate_total_labs_count
+        invalidate_total_labs_count()
         logger.debug("Course data cache invalidated")
     
     def invalidate_all_caches(self):
@@ -947,17 +1210,14 @@ class GoogleSheetsManager:
         self.invalidate_course_data_cache()
         
         # Clear student data cache
-        if 'all_students' in self._cache:
-            del self._cache['all_students']
+        self._invalidate_cached('all_students')
         
         # Clear sheet-specific caches
         keys_to_clear = [
             f"survey_{self.survey_spreadsheet_id}",
             f"register_{self.register_spreadsheet_id}",
         ]
-        for key in keys_to_clear:
-            if key in self._cache:
-                del self._cache[key]
+        self._invalidate_cached(*keys_to_clear)
         
         logger.info("All caches invalidated")
 
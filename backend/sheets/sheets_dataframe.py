@@ -1,8 +1,52 @@
 """
 DataFrame normalization helpers.
 """
+import re
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+
 import pandas as pd
 
+# Helper column holding the normalized (stripped, lower-cased) email of a row
+EMAIL_KEY_COLUMN = "_email_key"
+
+# Normalized header spellings that identify an email column, most specific
+# first ("Email Address", "email_address", "E-mail", "Email", ...)
+EMAIL_HEADER_ALIASES = ("emailaddress", "email")
+_EMAIL_HEADER_RANK = {alias: rank for rank, alias in enumerate(EMAIL_HEADER_ALIASES)}
+
+_HEADER_NOISE = re.compile(r"[\s\-_.]")
+
+
+def normalize_header(header: str) -> str:
+    """Lower-case a header and drop whitespace, '-', '_' and '.'."""
+    return _HEADER_NOISE.sub("", str(header).lower())
+
+
+@lru_cache(maxsize=64)
+def _email_columns(columns: Tuple[str, ...]) -> Tuple[str, ...]:
+    matches = [
+        (_EMAIL_HEADER_RANK[norm], i, col)
+        for i, col in enumerate(columns)
+        if (norm := normalize_header(col)) in _EMAIL_HEADER_RANK
+    ]
+    return tuple(col for _, _, col in sorted(matches))
+
+
+def email_columns(columns: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Return the email columns among columns, most specific alias first.
+
+    Cached per header tuple, so repeated reads of the same sheet skip the scan.
+    """
+    return _email_columns(tuple(columns))
+
+
+def find_email_column(columns: Iterable[str]) -> Optional[str]:
+    """Return the preferred email column, or None if there is none."""
+    matches = email_columns(columns)
+    return matches[0] if matches else None
+
 
 def normalize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -20,3 +64,16 @@ def normalize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def add_email_key(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add EMAIL_KEY_COLUMN with each row's normalized email in one vectorized pass.
+
+    Uses the first non-empty email column per row; rows without an email get <NA>.
+    """
+    key = None
+    for col in email_columns(df.columns):
+        column = df[col].astype("string").str.strip().str.lower().replace("", pd.NA)
+        key = column if key is None else key.fillna(column)
+    if key is not None:
+        df[EMAIL_KEY_COLUMN] = key
+    return df
@@ -0,0 +1,38 @@
+"""
+Client-side rate limiting for Google Sheets API calls.
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Allows bursts of up to `capacity` requests, then sustains
+    `refill_per_sec` requests per second. Threads only wait when the bucket
+    is empty, so concurrent requests within the budget run in parallel.
+    """
+
+    def __init__(self, capacity: float = 60, refill_per_sec: float = 1.0):
+        self.capacity = float(capacity)
+        self.refill_per_sec = float(refill_per_sec)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Take `tokens` from the bucket, sleeping until enough have refilled."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.refill_per_sec,
+                )
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.refill_per_sec
+            time.sleep(wait)
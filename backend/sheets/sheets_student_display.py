@@ -1,19 +1,27 @@
 """
 Helpers to prepare student rows for API responses.
 """
-from typing import Any, Dict
+from typing import Any, Dict, Mapping, Union
 
 import pandas as pd
 
 from sheets.sheets_attendance import format_attendance
 
+# Fields whose blank values stay "" instead of becoming None
+_KEEP_EMPTY_FIELDS = frozenset({"Name", "Email Address"})
 
-def prepare_student_for_display(student_row: pd.Series) -> Dict[str, Any]:
+
+def prepare_student_for_display(student_row: Union[Mapping[str, Any], pd.Series]) -> Dict[str, Any]:
     """
     Convert student DataFrame row to dictionary for API response.
     Handles attendance JSON parsing and data type conversion.
+
+    Accepts a record from DataFrame.to_dict('records') (preferred) or a Series.
     """
-    student_dict = student_row.to_dict()
+    if isinstance(student_row, pd.Series):
+        student_dict = student_row.to_dict()
+    else:
+        student_dict = dict(student_row)
 
     # Ensure Name field is set (try multiple name field variations)
     if (
@@ -62,14 +70,18 @@ def prepare_student_for_display(student_row: pd.Series) -> Dict[str, Any]:
         attendance_str = student_dict.get("Attendance", "{}")
         student_dict["Attendance"] = format_attendance(attendance_str)
 
-    # Convert NaN to None for JSON serialization, and handle empty strings
-    for key, value in list(student_dict.items()):
-        if pd.isna(value):
-            student_dict[key] = None
-        elif isinstance(value, str) and value.strip() == "":
+    # Convert NaN to None for JSON serialization, and handle empty strings.
+    # None and str (nearly every sheet cell) are settled with cheap type
+    # checks; pd.isna only runs for the remaining values.
+    for key, value in student_dict.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
             # Keep empty strings as empty strings (not None) for some fields
-            if key not in ["Name", "Email Address"]:
+            if not value.strip() and key not in _KEEP_EMPTY_FIELDS:
                 student_dict[key] = None
+        elif pd.isna(value):
+            student_dict[key] = None
         elif isinstance(value, (pd.Timestamp, pd.DatetimeTZDtype)):
             student_dict[key] = value.isoformat()
 
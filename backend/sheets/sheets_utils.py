@@ -7,11 +7,13 @@ more modular and maintainable.
 """
 
 from sheets.sheets_attendance import format_attendance, format_attendance_to_string
-from sheets.sheets_dataframe import normalize_dataframe
+from sheets.sheets_dataframe import EMAIL_KEY_COLUMN, add_email_key, normalize_dataframe
 from sheets.sheets_email import validate_email, validate_email_list
 from sheets.sheets_student_display import prepare_student_for_display
 
 __all__ = [
+    "EMAIL_KEY_COLUMN",
+    "add_email_key",
     "format_attendance",
     "format_attendance_to_string",
     "validate_email",
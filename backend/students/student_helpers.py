@@ -2,10 +2,15 @@
 Helper functions for student operations endpoints.
 Extracted common patterns to reduce code duplication.
 """
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, FrozenSet, List, Any, Optional, Tuple
 import json
+import time
+from functools import lru_cache
 from core.logger import logger
 
+# How long a computed lab count is reused before re-reading course data
+TOTAL_LABS_CACHE_TTL = 300
+
 
 def get_total_labs_count_from_data(course_data: Optional[Dict[str, Any]]) -> int:
     """
@@ -159,22 +164,39 @@ def get_course_module_structure(course_data: Optional[Dict[str, Any]]) -> Dict[s
     return structure
 
 
+@lru_cache(maxsize=1)
+def _cached_total_labs_count() -> Tuple[int, float]:
+    """
+    Read course data and return (total_labs, expiry).
+
+    Memoized process-wide; failures raise and are therefore never cached.
+    """
+    from firestore.course_data import get_course_data as get_course_data_from_firestore
+    course_data = get_course_data_from_firestore()
+    return get_total_labs_count_from_data(course_data), time.time() + TOTAL_LABS_CACHE_TTL
+
+
+def invalidate_total_labs_count() -> None:
+    """Drop the cached lab count. Call after course structure changes."""
+    _cached_total_labs_count.cache_clear()
+
+
 def get_total_labs_count() -> int:
     """
     Get total number of labs across all modules from course data.
     
     Supports both legacy single-course structure and new multi-course structure.
-    Reads from Firestore.
+    Reads from Firestore at most once per TOTAL_LABS_CACHE_TTL seconds.
     
     Returns:
         Total number of labs (defaults to 2 if course data unavailable, min 0, max 500)
     """
     try:
-        # Get course data from Firestore
-        from firestore.course_data import get_course_data as get_course_data_from_firestore
-        course_data = get_course_data_from_firestore()
-        
-        return get_total_labs_count_from_data(course_data)
+        total_labs, expiry = _cached_total_labs_count()
+        if time.time() >= expiry:
+            _cached_total_labs_count.cache_clear()
+            total_labs, _ = _cached_total_labs_count()
+        return total_labs
     except Exception as e:
         logger.warning(f"Could not get course data for assignment grades: {str(e)}")
         return 2  # Default
@@ -196,6 +218,15 @@ def get_allowed_assignment_fields(total_labs: int) -> List[str]:
     return allowed_fields
 
 
+@lru_cache(maxsize=8)
+def get_allowed_assignment_field_set(total_labs: int) -> FrozenSet[str]:
+    """
+    Same fields as get_allowed_assignment_fields, as a frozenset for O(1)
+    membership checks. Cached per lab count.
+    """
+    return frozenset(get_allowed_assignment_fields(total_labs))
+
+
 def get_student_email(student: Dict[str, Any]) -> str:
     """
     Extract email address from student dictionary (handles multiple field name variations).
@@ -343,6 +374,10 @@ def calculate_student_status(students: List[Dict[str, Any]], total_labs: int) ->
     missing_resume = []
     missing_attendance = []
     missing_grades = []
+    # Column/label pairs are the same for every student, so build them once
+    grade_columns = [
+        (f'Assignment {i} Grade', f'Assignment {i}') for i in range(1, total_labs + 1)
+    ]
     
     for student in students:
         email = get_student_email(student)
@@ -374,12 +409,11 @@ def calculate_student_status(students: List[Dict[str, Any]], total_labs: int) ->
             })
         
         # Check grades
-        missing_assignment_grades = []
-        for i in range(total_labs):
-            grade_col = f'Assignment {i+1} Grade'
-            grade = student.get(grade_col, '')
-            if not grade or str(grade).strip() == '':
-                missing_assignment_grades.append(f'Assignment {i+1}')
+        missing_assignment_grades = [
+            label
+            for grade_col, label in grade_columns
+            if not (grade := student.get(grade_col, '')) or str(grade).strip() == ''
+        ]
         
         if missing_assignment_grades:
             missing_grades.append({